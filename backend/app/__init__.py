@@ -1,11 +1,14 @@
 import os
+import threading
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 
-db = SQLAlchemy()
+from app.database import READONLY_BIND, RoutingSession, apply_sqlite_pragmas, is_sqlite_file
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 jwt = JWTManager()
 
 # Docker 构建时前端产物会被复制到此目录
@@ -16,14 +19,47 @@ def create_app():
     app = Flask(__name__, static_folder=None)
     app.config.from_object("config.Config")
 
+    if app.config["FAST_JSON"]:
+        from app.json_provider import FastJSONProvider
+
+        app.json = FastJSONProvider(app)
+
     # Ensure upload folder exists
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
+    # An in-memory database is private to its connection: no QueuePool, and
+    # a second engine would open a different, empty database
+    if is_sqlite_file(app.config["SQLALCHEMY_DATABASE_URI"]):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            **app.config["DB_POOL_OPTIONS"],
+            **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+        }
+        readonly_url = app.config["READONLY_DATABASE_URL"] or app.config["SQLALCHEMY_DATABASE_URI"]
+        if app.config["READONLY_ENGINE"] and is_sqlite_file(readonly_url):
+            app.config["SQLALCHEMY_BINDS"] = {
+                READONLY_BIND: {"url": readonly_url, **app.config["SQLALCHEMY_ENGINE_OPTIONS"]},
+            }
+
     # Init extensions
     db.init_app(app)
     jwt.init_app(app)
     CORS(app)
 
+    from app.cache import listing_cache
+
+    listing_cache.maxsize = app.config["LISTING_CACHE_SIZE"]
+    listing_cache.ttl = app.config["LISTING_CACHE_TTL"]
+
+    from app.images import variant_worker
+
+    variant_worker.max_workers = app.config["IMAGE_WORKERS"]
+
+    from app.passwords import password_hasher
+
+    password_hasher.rounds = app.config["BCRYPT_ROUNDS"]
+    password_hasher.workers = app.config["PASSWORD_HASH_WORKERS"]
+    password_hasher.max_pending = app.config["PASSWORD_HASH_MAX_PENDING"]
+
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.items import items_bp
@@ -41,30 +77,79 @@ def create_app():
     app.register_blueprint(upload_bp, url_prefix="/api/upload")
     app.register_blueprint(comments_bp, url_prefix="/api/items")
 
+    from app.static_files import init_static, send_frontend, send_upload
+
+    # Scan the built SPA once; requests are routed from the manifest
+    init_static(app, STATIC_DIR)
+
     # Serve uploaded files
     @app.route("/uploads/<path:filename>")
     def uploaded_file(filename):
-        return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+        return send_upload(filename)
 
     # SPA fallback: non-API routes all return index.html
     @app.route("/", defaults={"path": ""})
     @app.route("/<path:path>")
     def serve_frontend(path):
-        # If the requested file exists in static dir, serve it directly
-        if path and os.path.exists(os.path.join(STATIC_DIR, path)):
-            return send_from_directory(STATIC_DIR, path)
-        # Otherwise serve index.html for SPA client-side routing
-        return send_from_directory(STATIC_DIR, "index.html")
+        return send_frontend(STATIC_DIR, path)
 
     # Create tables
     with app.app_context():
+        pragmas = app.config["SQLITE_PRAGMAS"]
+        apply_sqlite_pragmas(db.engines[None], pragmas)
+        if READONLY_BIND in db.engines:
+            # journal_mode is a property of the file, set by the primary
+            readonly_pragmas = {k: v for k, v in pragmas.items() if k != "journal_mode"}
+            apply_sqlite_pragmas(
+                db.engines[READONLY_BIND], {**readonly_pragmas, "query_only": "ON"}
+            )
+
         from app import models  # noqa: F401
 
         db.create_all()
 
-    # Start scheduler for auction expiry checks
-    from app.scheduler import start_scheduler
+        from app.schema import upgrade_schema
 
-    start_scheduler(app)
+        upgrade_schema()
+
+        from app.search import init_search_index
+
+        init_search_index(app)
+
+    from app.commands import register_commands
+
+    register_commands(app)
+
+    if app.config["DEFER_BACKGROUND_TASKS"]:
+        pass
+    elif os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        # Maintenance commands must not join the scheduler election; only
+        # `flask run` serves requests, so start the threads on the first one
+        started = threading.Lock()
+
+        @app.before_request
+        def start_on_first_request():
+            if started.acquire(blocking=False):
+                start_background_tasks(app)
+    else:
+        start_background_tasks(app)
 
     return app
+
+
+def start_background_tasks(app):
+    """Start the per-process threads; call once in every serving process."""
+    if app.config["PROCESS_BUS_DIR"]:
+        from app.bus import process_bus
+
+        process_bus.start(app.config["PROCESS_BUS_DIR"], app.logger)
+
+    # Write buffered view counts back periodically (and at exit)
+    from app.counters import view_counter
+
+    view_counter.start(app, app.config["VIEW_FLUSH_SECONDS"])
+
+    # Auction expiry and maintenance jobs, in the elected leader only
+    from app.scheduler import start_scheduler
+
+    start_scheduler(app)
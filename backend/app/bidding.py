@@ -0,0 +1,75 @@
+"""出价引擎：同一拍品的出价在进程内串行执行，数据库侧再用条件 UPDATE 兜底。"""
+import threading
+from contextlib import contextmanager
+
+from app import db
+from app.models import AuctionItem
+
+# 条件更新失败（被其他进程抢先）时的最大重试次数
+MAX_CONFLICT_RETRIES = 3
+
+
+class ItemSequencer:
+    """Per-item mutex registry.
+
+    Bids on the same item queue up behind one lock, bids on different items
+    never touch each other's lock. Locks are dropped once nobody holds or
+    waits on them, so the registry only grows with concurrently hot items.
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}  # item_id -> [lock, holders]
+
+    @contextmanager
+    def hold(self, item_id):
+        with self._guard:
+            entry = self._locks.get(item_id)
+            if entry is None:
+                entry = self._locks[item_id] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[item_id]
+
+
+item_sequencer = ItemSequencer()
+
+
+def claim_bid(item, bid, price, now, end_time=None, winner_id=None):
+    """Atomically make the flushed ``bid`` the leader of ``item`` at ``price``.
+
+    The UPDATE only matches while ``bid_count``/``current_price`` still hold
+    the values the caller validated against, so a concurrent writer in another
+    process makes this return False instead of silently losing its bid.
+    """
+    values = {
+        "current_price": price,
+        "bid_count": AuctionItem.bid_count + 1,
+        "leading_bid_id": bid.id,
+        "leading_bidder_id": bid.bidder_id,
+        "updated_at": now,
+    }
+    if end_time is not None:
+        values["end_time"] = end_time
+    if winner_id is not None:
+        values["status"] = AuctionItem.STATUS_ENDED_WON
+        values["winner_id"] = winner_id
+
+    result = db.session.execute(
+        db.update(AuctionItem)
+        .where(
+            AuctionItem.id == item.id,
+            AuctionItem.status == AuctionItem.STATUS_ACTIVE,
+            AuctionItem.bid_count == item.bid_count,
+            AuctionItem.current_price == item.current_price,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
@@ -0,0 +1,84 @@
+"""进程间广播：多 worker 部署时，把实时事件、缓存失效和拍卖截止时间同步给同机的其他 worker。"""
+import json
+import os
+import socket
+import threading
+
+# 单条消息上限；实时事件和失效通知都远小于此
+MAX_MESSAGE = 64 * 1024
+
+
+class ProcessBus:
+    """Best-effort fan-out between worker processes on one host.
+
+    Every process binds a Unix datagram socket named after its pid in a
+    shared directory; ``broadcast`` sends to all other sockets found there.
+    Sends never block: a message that doesn't fit a busy peer's buffer is
+    dropped, which the callers tolerate (caches expire, clients reconnect,
+    the reconciliation sweep catches missed deadlines). Before ``start``,
+    or on a platform without Unix sockets, ``broadcast`` does nothing and
+    the app behaves as a single process.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self._directory = None
+        self._name = None
+        self._sock = None
+
+    @property
+    def active(self):
+        return self._sock is not None
+
+    def register(self, topic, handler):
+        self._handlers[topic] = handler
+
+    def start(self, directory, logger):
+        if self._sock is not None or not hasattr(socket, "AF_UNIX"):
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._name = f"{os.getpid()}.sock"
+        path = os.path.join(directory, self._name)
+        if os.path.exists(path):
+            os.remove(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        self._directory, self._sock = directory, sock
+
+        def run():
+            while True:
+                data = sock.recv(MAX_MESSAGE)
+                try:
+                    topic, payload = json.loads(data)
+                    self._handlers[topic](payload)
+                except Exception:
+                    logger.exception("Failed to handle bus message")
+
+        threading.Thread(target=run, name="process-bus", daemon=True).start()
+
+    def broadcast(self, topic, payload):
+        if self._sock is None:
+            return
+        data = json.dumps([topic, payload], separators=(",", ":")).encode("utf-8")
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            for name in os.listdir(self._directory):
+                if name == self._name or not name.endswith(".sock"):
+                    continue
+                path = os.path.join(self._directory, name)
+                try:
+                    sender.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # The worker is gone; drop its socket file
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                except OSError:
+                    pass  # Peer buffer full or message too large: drop
+        finally:
+            sender.close()
+
+
+process_bus = ProcessBus()
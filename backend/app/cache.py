@@ -0,0 +1,105 @@
+"""进程内响应缓存：TTL 过期 + LRU 淘汰，写操作通过 invalidate() 整体失效。"""
+import threading
+import time
+from collections import OrderedDict
+
+from app.bus import process_bus
+
+_caches = {}
+
+
+class ResponseCache:
+    """Thread-safe TTL/LRU cache of response payloads.
+
+    ``invalidate`` bumps a generation counter and drops every entry. A
+    request that started computing before an invalidation passes the
+    generation it saw to ``set`` and its (possibly stale) result is discarded.
+    Invalidations are relayed to the other worker processes by ``name``.
+    """
+
+    def __init__(self, name, maxsize=256, ttl=30):
+        self.name = name
+        _caches[name] = self
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        """Drop one entry; in-flight computations of any key are discarded too."""
+        self._drop(key)
+        process_bus.broadcast("cache", [self.name, key])
+
+    def invalidate(self):
+        self._drop(None)
+        process_bus.broadcast("cache", [self.name, None])
+
+    def _drop(self, key):
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# 公共拍品列表（GET /api/items）的缓存
+listing_cache = ResponseCache("listing")
+
+# 拍品详情中的点赞用户首页（用户 id 列表），按拍品 id 缓存，点赞/取消时单独失效
+liked_users_cache = ResponseCache("liked_users", maxsize=1024, ttl=300)
+
+# 用户公开资料（昵称、头像），序列化卖家/出价人/留言人时使用，修改资料时按用户 id 失效
+public_user_cache = ResponseCache("public_users", maxsize=10000, ttl=600)
+
+# 拍品卡片 / 详情的序列化快照，键中含 updated_at，拍品一改动旧快照自然不再命中，无需失效
+item_snapshot_cache = ResponseCache("item_snapshots", maxsize=5000, ttl=3600)
+
+process_bus.register("cache", lambda payload: _caches[payload[0]]._drop(payload[1]))
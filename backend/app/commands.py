@@ -0,0 +1,212 @@
+"""维护用命令行工具，通过 ``flask --app run <command>`` 调用。"""
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app import STATIC_DIR, db
+from app.images import generate_variants, is_variant_filename
+from app.importer import ItemImporter, read_rows
+from app.models import AuctionItem, Bid
+from app.search import rebuild_search_index
+from app.static_files import compress_static
+from app.storage import collect_garbage, recount_refs, register_existing
+
+# import-items 在终端里最多列出的被拒绝行，全部错误见 --rejects 文件
+MAX_REJECTS_SHOWN = 20
+
+
+def register_commands(app):
+    app.cli.add_command(repair_leaders)
+    app.cli.add_command(rebuild_search)
+    app.cli.add_command(generate_image_variants)
+    app.cli.add_command(compress_static_files)
+    app.cli.add_command(sync_uploads)
+    app.cli.add_command(gc_uploads)
+    app.cli.add_command(import_items)
+
+
+@click.command("repair-leaders")
+@with_appcontext
+@click.option("--chunk", default=1000, show_default=True, help="每个事务处理的拍品数")
+def repair_leaders(chunk):
+    """Backfill AuctionItem.leading_bid_id / leading_bidder_id from the bids table."""
+    # Only bids of the current listing count; re-listing resets bid_count
+    top_bid = db.case(
+        (
+            AuctionItem.bid_count > 0,
+            db.select(Bid.id)
+            .where(
+                Bid.item_id == AuctionItem.id,
+                db.or_(AuctionItem.start_time.is_(None), Bid.created_at >= AuctionItem.start_time),
+            )
+            .order_by(Bid.amount.desc(), Bid.id)
+            .limit(1)
+            .scalar_subquery(),
+        ),
+        else_=None,
+    )
+    top_bidder = (
+        db.select(Bid.bidder_id)
+        .where(Bid.id == AuctionItem.leading_bid_id)
+        .scalar_subquery()
+    )
+
+    max_id = db.session.query(db.func.max(AuctionItem.id)).scalar() or 0
+    fixed = 0
+    for low in range(0, max_id, chunk):
+        in_range = db.and_(AuctionItem.id > low, AuctionItem.id <= low + chunk)
+        # Two passes: the bidder is looked up from the bid chosen in the first
+        result = db.session.execute(
+            db.update(AuctionItem)
+            .where(in_range, AuctionItem.leading_bid_id.is_distinct_from(top_bid))
+            .values(leading_bid_id=top_bid)
+            .execution_options(synchronize_session=False)
+        )
+        fixed += result.rowcount
+        db.session.execute(
+            db.update(AuctionItem)
+            .where(in_range, AuctionItem.leading_bidder_id.is_distinct_from(top_bidder))
+            .values(leading_bidder_id=top_bidder)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    click.echo(f"Repaired leader fields on {fixed} item(s)")
+
+
+@click.command("rebuild-search-index")
+@with_appcontext
+def rebuild_search():
+    """Rebuild the item full-text search index from auction_items."""
+    if not current_app.extensions.get("search_index"):
+        raise click.ClickException("当前数据库不支持 FTS5 全文索引")
+    rebuild_search_index()
+    click.echo("Search index rebuilt")
+
+
+@click.command("generate-image-variants")
+@with_appcontext
+@click.option("--overwrite", is_flag=True, help="重新生成已存在的变体")
+@click.option("--workers", default=4, show_default=True, help="并行处理的线程数")
+def generate_image_variants(overwrite, workers):
+    """Backfill thumbnail / WebP variants for existing uploads."""
+    folder = current_app.config["UPLOAD_FOLDER"]
+    allowed = current_app.config["ALLOWED_EXTENSIONS"]
+    originals = [
+        name for name in sorted(os.listdir(folder))
+        if "." in name
+        and name.rsplit(".", 1)[1].lower() in allowed
+        and not is_variant_filename(name)
+    ]
+
+    def run(name):
+        try:
+            return generate_variants(folder, name, overwrite)
+        except Exception as exc:
+            click.echo(f"Skipped {name}: {exc}", err=True)
+            return 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        written = sum(pool.map(run, originals))
+    click.echo(f"Wrote {written} variant(s) for {len(originals)} upload(s)")
+
+
+@click.command("compress-static")
+@with_appcontext
+@click.option("--force", is_flag=True, help="重新压缩已有的 .gz / .br 文件")
+def compress_static_files(force):
+    """Precompress the built frontend (gzip, and brotli if installed)."""
+    written = compress_static(STATIC_DIR, force)
+    click.echo(f"Wrote {written} compressed file(s); restart to pick them up")
+
+
+@click.command("sync-uploads")
+@with_appcontext
+def sync_uploads():
+    """Register uploads already on disk and recount their references."""
+    folder = current_app.config["UPLOAD_FOLDER"]
+    added = register_existing(folder, current_app.config["ALLOWED_EXTENSIONS"])
+    db.session.flush()
+    changed = recount_refs()
+    db.session.commit()
+    click.echo(f"Registered {added} file(s), corrected {changed} reference count(s)")
+
+
+@click.command("gc-uploads")
+@with_appcontext
+@click.option("--batch", default=1000, show_default=True, help="最多删除的文件数")
+@click.option("--grace-hours", default=24, show_default=True, help="无人引用多久后才删除")
+def gc_uploads(batch, grace_hours):
+    """Delete uploaded files that no item image or avatar references."""
+    removed = collect_garbage(
+        current_app.config["UPLOAD_FOLDER"], batch=batch, grace=timedelta(hours=grace_hours)
+    )
+    click.echo(f"Removed {removed} unreferenced file(s)")
+
+
+@click.command("import-items")
+@with_appcontext
+@click.argument("source", type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option(
+    "--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+    help="文件格式，默认按扩展名判断（标准输入默认 jsonl）",
+)
+@click.option("--chunk", default=1000, show_default=True, help="每个事务写入的行数")
+@click.option("--seller-id", type=int, help="行内未指定卖家时使用的用户 id")
+@click.option(
+    "--images-from", type=click.Path(exists=True, file_okay=False),
+    help="图片目录：行内的相对路径从这里复制到上传目录",
+)
+@click.option("--workers", default=4, show_default=True, help="并行处理图片的线程数")
+@click.option("--rejects", type=click.File("w", encoding="utf-8"), help="被拒绝的行写入此 JSONL 文件")
+@click.option("--dry-run", is_flag=True, help="只校验，不写入")
+def import_items(source, fmt, chunk, seller_id, images_from, workers, rejects, dry_run):
+    """Bulk-import auction items (with images and bid history) from CSV or JSONL.
+
+    New deadlines reach the scheduler leader through the notification
+    outbox, which its worker polls every few seconds.
+    """
+    fmt = fmt or ("csv" if source.lower().endswith(".csv") else "jsonl")
+    shown = 0
+
+    def on_reject(line_number, errors, row):
+        nonlocal shown
+        if shown < MAX_REJECTS_SHOWN:
+            click.echo(f"line {line_number}: {'；'.join(errors)}", err=True)
+            shown += 1
+        if rejects:
+            rejects.write(
+                json.dumps({"line": line_number, "errors": errors, "row": row}, ensure_ascii=False) + "\n"
+            )
+
+    importer = ItemImporter(
+        current_app._get_current_object(),
+        chunk_size=chunk,
+        seller_id=seller_id,
+        image_dir=images_from,
+        workers=workers,
+        dry_run=dry_run,
+        on_reject=on_reject,
+        log=lambda message: click.echo(message, err=True),
+    )
+    if source == "-":
+        stats = importer.run(read_rows(sys.stdin, fmt))
+    else:
+        # newline="" lets the csv module handle line breaks inside quoted fields
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            stats = importer.run(read_rows(f, fmt))
+
+    if stats["rejected"] > shown:
+        click.echo(f"... {stats['rejected'] - shown} more rejected row(s)", err=True)
+    verb = "Validated" if dry_run else "Imported"
+    click.echo(
+        f"{verb} {stats['imported']} item(s), {stats['images']} image(s), {stats['bids']} bid(s); "
+        f"rejected {stats['rejected']} of {stats['rows']} row(s) "
+        f"in {stats['elapsed']:.1f}s ({importer.rows_per_second:.0f} rows/s)"
+    )
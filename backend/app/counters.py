@@ -0,0 +1,77 @@
+"""浏览量写缓冲：浏览计数先在内存中合并，定期批量写回数据库。"""
+import atexit
+import threading
+from collections import Counter
+
+from app import db
+
+
+class ViewCounter:
+    """Coalesces item view increments and flushes them in one batched UPDATE.
+
+    Each process keeps its own buffer and adds its deltas with
+    ``view_count = view_count + ?``, so several workers flushing
+    independently still sum correctly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, item_id):
+        with self._lock:
+            self._pending[item_id] += 1
+
+    def pending(self, item_id):
+        with self._lock:
+            return self._pending.get(item_id, 0)
+
+    def flush(self, app):
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+        if not batch:
+            return 0
+
+        from app.models import AuctionItem
+
+        table = AuctionItem.__table__
+        stmt = (
+            table.update()
+            .where(table.c.id == db.bindparam("item_id"))
+            .values(
+                view_count=table.c.view_count + db.bindparam("delta"),
+                # Views aren't edits: keep updated_at (and ETags) unchanged
+                updated_at=table.c.updated_at,
+            )
+        )
+        try:
+            with app.app_context():
+                db.session.execute(
+                    stmt, [{"item_id": k, "delta": v} for k, v in batch.items()]
+                )
+                db.session.commit()
+        except Exception:
+            # Put the counts back so the next flush retries them
+            with self._lock:
+                self._pending.update(batch)
+            app.logger.exception("Failed to flush %d view counts", len(batch))
+            return 0
+        return len(batch)
+
+    def start(self, app, interval):
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                self.flush(app)
+
+        self._thread = threading.Thread(target=run, name="view-counter", daemon=True)
+        self._thread.start()
+        # Don't lose buffered views when the worker exits
+        atexit.register(self.flush, app)
+
+
+view_counter = ViewCounter()
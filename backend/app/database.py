@@ -0,0 +1,48 @@
+"""数据库连接调优：SQLite 连接建立时设置 PRAGMA（WAL 等）；GET 请求的查询可走独立的只读连接池。"""
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+READONLY_BIND = "readonly"
+
+
+def is_sqlite_file(url):
+    """True for a SQLite URL backed by a file, False for in-memory and other databases."""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return False
+    database = url.database or ""
+    return database not in ("", ":memory:") and url.query.get("mode") != "memory"
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run ``PRAGMA name=value`` for every new connection of a SQLite engine."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of GET/HEAD requests to the read-only engine.
+
+    Writes (flushes) always use the primary engine, and so does everything
+    outside a request: the scheduler, view counter flushes and CLI commands.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and READONLY_BIND in self._db.engines
+            and has_request_context()
+            and request.method in ("GET", "HEAD")
+        ):
+            return self._db.engines[READONLY_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
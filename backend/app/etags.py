@@ -0,0 +1,51 @@
+"""拍品相关 GET 接口的 ETag / 条件请求支持。"""
+import hashlib
+
+from flask import current_app, request
+
+from app import db
+from app.counters import view_counter
+from app.models import AuctionItem, Bid, Comment
+
+
+def item_etag(item_id, *extra, views=False):
+    """Strong ETag for an item-scoped GET, or None if the item doesn't exist.
+
+    The validator is the item's ``updated_at`` plus the latest bid and
+    comment ids, read in one indexed query without loading the item.
+    Path, query string and ``extra`` (e.g. the viewer) are folded in so
+    different representations never share a tag. With ``views`` the view
+    count is included too, stored plus this process's unflushed views, as
+    shown by ``to_dict``; view flushes leave ``updated_at`` alone.
+    """
+    columns = [
+        AuctionItem.updated_at,
+        db.select(db.func.max(Bid.id)).where(Bid.item_id == item_id).scalar_subquery(),
+        db.select(db.func.max(Comment.id)).where(Comment.item_id == item_id).scalar_subquery(),
+    ]
+    if views:
+        columns.append(AuctionItem.view_count)
+    row = db.session.query(*columns).filter(AuctionItem.id == item_id).first()
+    if row is None:
+        return None
+    validator = tuple(row)
+    if views:
+        # The sum doesn't change when a flush moves views into the table
+        validator = validator[:-1] + ((row[-1] or 0) + view_counter.pending(item_id),)
+    raw = repr((request.path, sorted(request.args.items(multi=True)), validator, extra))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def not_modified(etag):
+    """A 304 response if the client already has ``etag``, else None."""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        return with_etag(response, etag)
+    return None
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    # Always revalidate; the 304 path is cheap
+    response.headers["Cache-Control"] = "no-cache"
+    return response
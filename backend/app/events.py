@@ -0,0 +1,97 @@
+"""拍品实时事件：进程内发布/订阅，供 SSE 推送出价、状态与留言变化。"""
+import json
+import queue
+import threading
+from collections import defaultdict
+
+from app.bus import process_bus
+
+# 空闲时发送注释行保活，避免代理断开长连接
+HEARTBEAT_SECONDS = 15
+# 单个订阅者最多积压的事件数，超过即断开（客户端会自动重连）
+SUBSCRIBER_BUFFER = 100
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class ItemEventBroker:
+    """Fan-out of item events to every open stream of that item.
+
+    Each event is serialized once and the same string is queued for all
+    subscribers, so a popular item costs one encode per change no matter
+    how many tabs are watching it.
+    """
+
+    def __init__(self, buffer_size=SUBSCRIBER_BUFFER):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._buffer_size = buffer_size
+
+    def subscribe(self, item_id):
+        q = queue.Queue(maxsize=self._buffer_size)
+        with self._lock:
+            self._subscribers[item_id].add(q)
+        return q
+
+    def unsubscribe(self, item_id, q):
+        with self._lock:
+            subs = self._subscribers.get(item_id)
+            if subs is None:
+                return
+            subs.discard(q)
+            if not subs:
+                del self._subscribers[item_id]
+
+    def publish(self, item_id, event, data):
+        """Deliver to this process's streams and relay to the other workers."""
+        if not process_bus.active and not self._subscribers.get(item_id):
+            return
+        payload = format_event(event, data)
+        self._fanout(item_id, payload)
+        process_bus.broadcast("item_event", [item_id, payload])
+
+    def _fanout(self, item_id, payload):
+        with self._lock:
+            subs = list(self._subscribers.get(item_id, ()))
+        for q in subs:
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                # Slow consumer: drop it rather than block the writer
+                self.unsubscribe(item_id, q)
+                _close(q)
+
+    def stream(self, item_id, q, snapshot):
+        """Yield SSE chunks for ``q`` until the client goes away."""
+        try:
+            yield format_event("snapshot", snapshot)
+            while True:
+                try:
+                    payload = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if payload is None:
+                    break
+                yield payload
+        finally:
+            self.unsubscribe(item_id, q)
+
+
+def _close(q):
+    """Wake the stream so it ends; make room for the sentinel if needed."""
+    while True:
+        try:
+            q.put_nowait(None)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+item_events = ItemEventBroker()
+process_bus.register("item_event", lambda payload: item_events._fanout(*payload))
@@ -0,0 +1,105 @@
+"""上传图片的尺寸变体：后台线程池生成缩略图 / 详情图（WebP，去除 EXIF），与原图存放在同一目录。"""
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+# 变体名 -> 最长边像素；原图小于该尺寸时不放大
+VARIANTS = {"thumb": 480, "medium": 1280}
+WEBP_QUALITY = 80
+UPLOAD_URL_PREFIX = "/api/upload/files/"
+
+_VARIANT_RE = re.compile(r"^(?P<stem>.+)_(?P<variant>%s)\.webp$" % "|".join(VARIANTS))
+
+
+def variant_filename(filename, variant):
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}_{variant}.webp"
+
+
+def is_variant_filename(filename):
+    return _VARIANT_RE.match(filename) is not None
+
+
+def original_stem(filename):
+    """Stem of the original a variant filename was derived from, or None."""
+    match = _VARIANT_RE.match(filename)
+    return match.group("stem") if match else None
+
+
+def variant_url(url, variant):
+    """URL of ``variant`` for an uploaded image; other URLs are returned as-is."""
+    if not url or not url.startswith(UPLOAD_URL_PREFIX):
+        return url
+    return UPLOAD_URL_PREFIX + variant_filename(url[len(UPLOAD_URL_PREFIX):], variant)
+
+
+def generate_variants(folder, filename, overwrite=False):
+    """Write every missing WebP variant of ``folder/filename``; returns how many were written.
+
+    The image is decoded once, rotated per its EXIF orientation and saved
+    without metadata. Each variant is written to a temporary file and
+    renamed, so a concurrent request never reads a partial file.
+    """
+    targets = {
+        variant: os.path.join(folder, variant_filename(filename, variant))
+        for variant in VARIANTS
+    }
+    if not overwrite:
+        targets = {v: path for v, path in targets.items() if not os.path.exists(path)}
+    if not targets:
+        return 0
+
+    with Image.open(os.path.join(folder, filename)) as source:
+        # Animated GIFs get a still variant of their first frame
+        source.seek(0)
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    for variant, path in targets.items():
+        size = VARIANTS[variant]
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        # Unique temp name: the same file may be processed twice at once
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        with os.fdopen(fd, "wb") as out:
+            resized.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        os.replace(tmp_path, path)
+    return len(targets)
+
+
+class VariantWorker:
+    """Background pool that generates variants off the request thread.
+
+    Pillow releases the GIL while decoding, resizing and encoding, so a
+    small thread pool keeps uploads fast without blocking other requests.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="image-variants"
+            )
+        return self._executor
+
+    def submit(self, app, filename, overwrite=False):
+        folder = app.config["UPLOAD_FOLDER"]
+
+        def run():
+            try:
+                return generate_variants(folder, filename, overwrite)
+            except Exception:
+                app.logger.exception("Failed to generate variants of %s", filename)
+                return 0
+
+        return self._pool().submit(run)
+
+
+variant_worker = VariantWorker()
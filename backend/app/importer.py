@@ -0,0 +1,457 @@
+"""批量导入拍品：流式读取 CSV / JSONL，逐行校验后按块批量写入拍品、图片和历史出价。
+
+每行一件拍品，字段与创建拍品接口相同，另有：
+
+- ``seller_id`` / ``seller_email``：卖家，缺省时使用命令行的 ``--seller-id``
+- ``status``：``draft``（默认）或 ``active``；``active`` 需要未来的 ``end_time``，
+  ``start_time`` 缺省为导入时间
+- ``image_urls``：最多 5 张，CSV 中用 ``|`` 分隔；指定图片目录时，相对路径的图片
+  会复制进上传目录并生成变体
+- ``bids``：仅 ``active`` 拍品，按时间顺序的 ``{"bidder_id" | "bidder_email",
+  "amount", "created_at"}`` 列表，CSV 中写成 JSON 字符串
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from app import db
+from app.cache import listing_cache
+from app.images import UPLOAD_URL_PREFIX, generate_variants
+from app.models import AuctionItem, Bid, ItemImage, User
+from app.outbox import KIND_SCHEDULE_EXPIRY, enqueue_many
+from app.routes.items import validate_item_data
+from app.storage import retain_files, store_upload
+
+MAX_IMAGES = 5
+IMPORT_STATUSES = (AuctionItem.STATUS_DRAFT, AuctionItem.STATUS_ACTIVE)
+# 这些开头的图片按 URL 原样保存，不从图片目录复制
+_URL_PREFIXES = (UPLOAD_URL_PREFIX, "http://", "https://")
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row, error)`` for every record of a CSV or JSONL stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty cells count as missing, like absent JSON keys
+            yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, "")}, None
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, None, f"JSON 格式错误：{exc}"
+            continue
+        if isinstance(row, dict):
+            yield line_number, row, None
+        else:
+            yield line_number, row, "每行必须是一个 JSON 对象"
+
+
+def _parse_time(value, field):
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip())
+        except ValueError:
+            raise ValueError(f"{field} 不是有效的 ISO 8601 时间")
+    # Naive timestamps are taken as UTC, like the rest of the app stores them;
+    # offset-aware ones are converted, since only the wall-clock value is stored
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _user_ref(row, prefix):
+    """``("id", 3)`` / ``("email", "a@b.c")`` from ``<prefix>_id`` / ``<prefix>_email``."""
+    if row.get(f"{prefix}_id") not in (None, ""):
+        try:
+            return "id", int(row[f"{prefix}_id"])
+        except (ValueError, TypeError):
+            raise ValueError(f"{prefix}_id 格式错误")
+    if row.get(f"{prefix}_email"):
+        return "email", str(row[f"{prefix}_email"]).strip().lower()
+    return None
+
+
+class ItemImporter:
+    """Validates rows and writes them ``chunk_size`` at a time, one transaction per chunk.
+
+    Rejected rows are passed to ``on_reject(line_number, errors, row)``;
+    counters are kept in ``stats``.
+    """
+
+    def __init__(
+        self, app, chunk_size=1000, seller_id=None, image_dir=None, workers=4,
+        dry_run=False, on_reject=None, log=None,
+    ):
+        self.app = app
+        self.chunk_size = chunk_size
+        self.seller_id = seller_id
+        self.image_dir = os.path.realpath(image_dir) if image_dir else None
+        self.workers = workers
+        self.dry_run = dry_run
+        self.on_reject = on_reject
+        self.log = log
+        self.stats = {"rows": 0, "imported": 0, "rejected": 0, "bids": 0, "images": 0, "elapsed": 0.0}
+
+    def run(self, rows):
+        started = time.perf_counter()
+        self.now = datetime.now(timezone.utc)
+        batch = []
+        for line_number, row, error in rows:
+            self.stats["rows"] += 1
+            record, errors = (None, [error]) if error else self._prepare(row)
+            if errors:
+                self._reject(line_number, errors, row)
+                continue
+            batch.append((line_number, row, record))
+            if len(batch) >= self.chunk_size:
+                self._flush(batch)
+                batch = []
+                self._progress(started)
+        if batch:
+            self._flush(batch)
+        if self.stats["imported"] and not self.dry_run:
+            listing_cache.invalidate()
+        self.stats["elapsed"] = time.perf_counter() - started
+        return self.stats
+
+    @property
+    def rows_per_second(self):
+        elapsed = self.stats["elapsed"]
+        return self.stats["rows"] / elapsed if elapsed else 0.0
+
+    def _progress(self, started):
+        if self.log:
+            elapsed = time.perf_counter() - started
+            self.log(
+                f"{self.stats['rows']} row(s), {self.stats['imported']} imported, "
+                f"{self.stats['rejected']} rejected ({self.stats['rows'] / elapsed:.0f} rows/s)"
+            )
+
+    def _reject(self, line_number, errors, row):
+        self.stats["rejected"] += 1
+        if self.on_reject:
+            self.on_reject(line_number, errors, row)
+
+    def _prepare(self, row):
+        """Check everything that needs no database; returns ``(record, errors)``."""
+        errors = validate_item_data({**row, "title": str(row.get("title", ""))})
+        try:
+            seller = _user_ref(row, "seller") or (
+                ("id", self.seller_id) if self.seller_id is not None else None
+            )
+            if seller is None:
+                errors.append("缺少卖家（seller_id / seller_email）")
+        except ValueError as exc:
+            errors.append(str(exc))
+            seller = None
+
+        status = row.get("status", AuctionItem.STATUS_DRAFT)
+        if status not in IMPORT_STATUSES:
+            errors.append("状态只能是 draft 或 active")
+
+        start_time = end_time = None
+        try:
+            if row.get("end_time"):
+                end_time = _parse_time(row["end_time"], "end_time")
+            if row.get("start_time"):
+                start_time = _parse_time(row["start_time"], "start_time")
+        except ValueError as exc:
+            errors.append(str(exc))
+        if status == AuctionItem.STATUS_ACTIVE:
+            start_time = start_time or self.now
+            if end_time is None or end_time <= self.now:
+                errors.append("进行中的拍品需要晚于当前时间的 end_time")
+            if start_time > self.now:
+                errors.append("start_time 不能晚于当前时间")
+        else:
+            # Drafts get their times when published
+            start_time = end_time = None
+
+        images = row.get("image_urls") or []
+        if isinstance(images, str):
+            images = [part.strip() for part in images.split("|") if part.strip()]
+        if not isinstance(images, list) or not all(isinstance(i, str) for i in images):
+            errors.append("image_urls 格式错误")
+            images = []
+        elif len(images) > MAX_IMAGES:
+            errors.append(f"最多{MAX_IMAGES}张图片")
+        elif self.image_dir:
+            for ref in images:
+                if not ref.startswith(_URL_PREFIXES) and self._local_path(ref) is None:
+                    errors.append(f"图片路径超出图片目录：{ref}")
+
+        if errors:
+            return None, errors
+
+        starting_price = float(row["starting_price"])
+        increment = float(row.get("increment") or 1.0)
+        buyout_price = float(row["buyout_price"]) if row.get("buyout_price") else None
+        bids, bid_errors = self._prepare_bids(
+            row.get("bids"), status, starting_price, increment, buyout_price, start_time
+        )
+        if bid_errors:
+            return None, bid_errors
+
+        item = {
+            "title": str(row["title"]).strip(),
+            "description": str(row.get("description", "")).strip(),
+            "category": row.get("category", AuctionItem.CATEGORY_OTHER),
+            "condition": row.get("condition", AuctionItem.CONDITION_NEW),
+            "starting_price": starting_price,
+            "reserve_price": float(row["reserve_price"]) if row.get("reserve_price") else None,
+            "increment": increment,
+            "buyout_price": buyout_price,
+            "current_price": bids[-1]["amount"] if bids else starting_price,
+            "bid_count": len(bids),
+            "status": status,
+            "start_time": start_time,
+            "end_time": end_time,
+            "created_at": start_time or self.now,
+            "updated_at": bids[-1]["created_at"] if bids else self.now,
+        }
+        return {"item": item, "seller": seller, "images": images, "bids": bids}, []
+
+    def _prepare_bids(self, raw, status, starting_price, increment, buyout_price, start_time):
+        if raw in (None, "", []):
+            return [], []
+        if isinstance(raw, str):
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                return [], ["bids 不是有效的 JSON"]
+        if not isinstance(raw, list) or not all(isinstance(b, dict) for b in raw):
+            return [], ["bids 必须是对象列表"]
+        if status != AuctionItem.STATUS_ACTIVE:
+            return [], ["只有进行中的拍品可以导入出价记录"]
+
+        bids = []
+        previous = None
+        for n, raw_bid in enumerate(raw, 1):
+            try:
+                bidder = _user_ref(raw_bid, "bidder")
+                amount = float(raw_bid["amount"])
+                created_at = (
+                    _parse_time(raw_bid["created_at"], "created_at")
+                    if raw_bid.get("created_at") else self.now
+                )
+            except (KeyError, ValueError, TypeError) as exc:
+                message = "缺少 amount" if isinstance(exc, KeyError) else str(exc)
+                return [], [f"第{n}条出价：{message}"]
+            if bidder is None:
+                return [], [f"第{n}条出价：缺少出价人（bidder_id / bidder_email）"]
+
+            # Same rules as placing the bids one by one
+            min_bid = starting_price if previous is None else previous["amount"] + increment
+            if amount < min_bid:
+                return [], [f"第{n}条出价：出价至少为 {min_bid:.2f} 元"]
+            if buyout_price and amount >= buyout_price:
+                return [], [f"第{n}条出价：已达到一口价，拍品应已成交"]
+            if not start_time <= created_at <= self.now:
+                return [], [f"第{n}条出价：时间必须在拍卖开始之后、当前时间之前"]
+            if previous is not None and created_at < previous["created_at"]:
+                return [], [f"第{n}条出价：出价记录必须按时间顺序排列"]
+            previous = {"bidder": bidder, "amount": amount, "created_at": created_at}
+            bids.append(previous)
+        return bids, []
+
+    def _local_path(self, ref):
+        """Absolute path of an image under the image directory, or None if it escapes it."""
+        path = os.path.realpath(os.path.join(self.image_dir, ref))
+        return path if path.startswith(self.image_dir + os.sep) else None
+
+    def _flush(self, batch):
+        users = self._resolve_users([record for _, _, record in batch])
+        stored = self._store_images(batch)
+
+        # Rows were validated against the start of the run; a long import
+        # must not insert auctions that have ended since
+        now = datetime.now(timezone.utc)
+        accepted = []
+        for line_number, row, record in batch:
+            errors = self._bind(record, users, stored)
+            end_time = record["item"]["end_time"]
+            if end_time is not None and end_time <= now:
+                errors.append("end_time 已在导入过程中过去")
+            if errors:
+                self._reject(line_number, errors, row)
+            else:
+                accepted.append((line_number, row, record))
+        if not accepted:
+            return
+        records = [record for _, _, record in accepted]
+        if not self.dry_run:
+            try:
+                item_ids = self._insert(records)
+                # The CLI isn't on the process bus: hand the deadlines to the
+                # leader's expiry queue through the outbox, in this transaction
+                deadlines = [
+                    [item_id, record["item"]["end_time"].isoformat()]
+                    for item_id, record in zip(item_ids, records)
+                    if record["item"]["end_time"] is not None
+                ]
+                if deadlines:
+                    enqueue_many(
+                        KIND_SCHEDULE_EXPIRY, [{"deadlines": deadlines}], datetime.now(timezone.utc)
+                    )
+                db.session.commit()
+            except Exception as exc:
+                db.session.rollback()
+                for line_number, row, _ in accepted:
+                    self._reject(line_number, [f"写入失败：{exc}"], row)
+                return
+        self._count(records)
+
+    def _count(self, records):
+        self.stats["imported"] += len(records)
+        self.stats["bids"] += sum(len(r["bids"]) for r in records)
+        self.stats["images"] += sum(len(r["images"]) for r in records)
+
+    def _resolve_users(self, records):
+        """``{("id", 3): 3, ("email", "a@b.c"): 7}`` for every user the chunk refers to."""
+        refs = set()
+        for record in records:
+            refs.add(record["seller"])
+            refs.update(bid["bidder"] for bid in record["bids"])
+        ids = [value for kind, value in refs if kind == "id"]
+        emails = [value for kind, value in refs if kind == "email"]
+        users = {}
+        for column, values in (("id", ids), ("email", emails)):
+            for start in range(0, len(values), 500):
+                rows = db.session.execute(
+                    db.select(User.id, getattr(User, column))
+                    .where(getattr(User, column).in_(values[start:start + 500]))
+                )
+                users.update(((column, key), user_id) for user_id, key in rows)
+        return users
+
+    def _store_images(self, batch):
+        """Copy the chunk's local images into the upload folder, in parallel.
+
+        Returns ``{ref: (url, error)}``; a dry run only checks the files exist.
+        """
+        if not self.image_dir:
+            return {}
+        refs = {
+            ref
+            for _, _, record in batch
+            for ref in record["images"]
+            if not ref.startswith(_URL_PREFIXES)
+        }
+        if not refs:
+            return {}
+        if self.dry_run:
+            return {
+                ref: (None, None if os.path.isfile(self._local_path(ref)) else f"图片不存在：{ref}")
+                for ref in refs
+            }
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(refs, pool.map(self._store_image, refs)))
+
+    def _store_image(self, ref):
+        path = self._local_path(ref)
+        ext = ref.rsplit(".", 1)[-1].lower() if "." in ref else ""
+        with self.app.app_context():
+            if ext not in self.app.config["ALLOWED_EXTENSIONS"]:
+                return None, f"不支持的图片格式：{ref}"
+            folder = self.app.config["UPLOAD_FOLDER"]
+            try:
+                with open(path, "rb") as f:
+                    filename = store_upload(f, ext, folder)
+            except OSError as exc:
+                return None, f"无法读取图片 {ref}：{exc.strerror or exc}"
+            try:
+                generate_variants(folder, filename)
+            except Exception:
+                # The stored copy stays unreferenced and is collected later
+                return None, f"无法解析图片：{ref}"
+        return UPLOAD_URL_PREFIX + filename, None
+
+    def _bind(self, record, users, stored):
+        """Replace user and image references by ids / URLs; returns the row's errors."""
+        errors = []
+        seller_id = users.get(record["seller"])
+        if seller_id is None:
+            errors.append(f"卖家不存在：{record['seller'][1]}")
+        record["item"]["seller_id"] = seller_id
+
+        for n, bid in enumerate(record["bids"], 1):
+            bidder_id = users.get(bid["bidder"])
+            if bidder_id is None:
+                errors.append(f"第{n}条出价：出价人不存在：{bid['bidder'][1]}")
+            elif bidder_id == seller_id:
+                errors.append(f"第{n}条出价：不能对自己的拍品出价")
+            bid["bidder_id"] = bidder_id
+
+        urls = []
+        for ref in record["images"]:
+            url, error = stored.get(ref, (ref, None))
+            if error:
+                errors.append(error)
+            urls.append(url)
+        record["image_urls"] = urls
+        return errors
+
+    def _insert(self, records):
+        # Core inserts: batched into multi-row INSERT ... RETURNING statements
+        items = AuctionItem.__table__
+        item_ids = db.session.execute(
+            items.insert().returning(items.c.id, sort_by_parameter_order=True),
+            [record["item"] for record in records],
+        ).scalars().all()
+
+        image_rows, bid_rows, bid_owners = [], [], []
+        for item_id, record in zip(item_ids, records):
+            image_rows.extend(
+                {"item_id": item_id, "image_url": url, "sort_order": idx}
+                for idx, url in enumerate(record["image_urls"])
+            )
+            for bid in record["bids"]:
+                bid_rows.append({
+                    "item_id": item_id,
+                    "bidder_id": bid["bidder_id"],
+                    "amount": bid["amount"],
+                    "created_at": bid["created_at"],
+                })
+                bid_owners.append(item_id)
+        if image_rows:
+            db.session.execute(ItemImage.__table__.insert(), image_rows)
+            retain_files([row["image_url"] for row in image_rows])
+        if not bid_rows:
+            return item_ids
+
+        bids = Bid.__table__
+        bid_ids = db.session.execute(
+            bids.insert().returning(bids.c.id, sort_by_parameter_order=True), bid_rows
+        ).scalars().all()
+        # Amounts strictly increase, so each item's last bid leads
+        leaders = {}
+        for bid_id, item_id, row in zip(bid_ids, bid_owners, bid_rows):
+            leaders[item_id] = {
+                "item_id": item_id,
+                "bid_id": bid_id,
+                "bidder_id": row["bidder_id"],
+                "updated_at": row["created_at"],
+            }
+        db.session.execute(
+            items.update()
+            .where(items.c.id == db.bindparam("item_id"))
+            .values(
+                leading_bid_id=db.bindparam("bid_id"),
+                leading_bidder_id=db.bindparam("bidder_id"),
+                # Keep the last bid's time rather than the import time
+                updated_at=db.bindparam("updated_at"),
+            ),
+            list(leaders.values()),
+        )
+        return item_ids
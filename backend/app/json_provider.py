@@ -0,0 +1,35 @@
+"""JSON 编码：安装了 orjson 时用它序列化响应，否则沿用 Flask 默认实现。"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """``DefaultJSONProvider`` that encodes and decodes with orjson.
+
+    Output matches the default provider for the payloads this app returns
+    (ISO strings for datetimes are produced by the serializers). Calls with
+    options orjson doesn't understand, or values it can't encode, fall back
+    to the standard library.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {"indent", "separators", "sort_keys"}:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option).decode("utf-8")
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
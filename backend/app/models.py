@@ -1,6 +1,9 @@
 from datetime import datetime, timezone
 
 from app import db
+from app.cache import item_snapshot_cache, public_user_cache
+from app.counters import view_counter
+from app.images import variant_url
 
 
 def ensure_utc(dt):
@@ -83,6 +86,13 @@ class AuctionItem(db.Model):
     end_time = db.Column(db.DateTime(timezone=True), nullable=True)
     status = db.Column(db.String(20), default=STATUS_DRAFT, index=True)
     winner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    # 当前领先的出价，随出价原子更新，省去按金额排序查询 bids
+    leading_bid_id = db.Column(
+        db.Integer,
+        db.ForeignKey("bids.id", use_alter=True, name="fk_auction_items_leading_bid"),
+        nullable=True,
+    )
+    leading_bidder_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
     created_at = db.Column(
         db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
     )
@@ -98,7 +108,11 @@ class AuctionItem(db.Model):
         "ItemImage", backref="item", lazy="dynamic", cascade="all, delete-orphan"
     )
     bids = db.relationship(
-        "Bid", backref="item", lazy="dynamic", cascade="all, delete-orphan"
+        "Bid",
+        backref="item",
+        lazy="dynamic",
+        cascade="all, delete-orphan",
+        foreign_keys="Bid.item_id",
     )
     winner = db.relationship("User", foreign_keys=[winner_id])
     likes = db.relationship(
@@ -106,10 +120,31 @@ class AuctionItem(db.Model):
     )
 
     def to_dict(self, include_reserve=False):
+        key = ("detail", self.id, self.updated_at)
+        snapshot = item_snapshot_cache.get(key)
+        if snapshot is None:
+            generation = item_snapshot_cache.generation
+            snapshot = self._detail_snapshot(load_images([self.id]).get(self.id, []))
+            item_snapshot_cache.set(key, snapshot, generation)
         data = {
+            **snapshot,
+            "seller": load_public_users([self.seller_id]).get(self.seller_id),
+            "view_count": (self.view_count or 0) + view_counter.pending(self.id),
+        }
+        # Reserve price is only visible to the seller
+        if include_reserve:
+            data["reserve_price"] = self.reserve_price
+        else:
+            # Show whether reserve price has been met
+            data["reserve_met"] = self._is_reserve_met()
+            data["has_reserve"] = self.reserve_price is not None
+        return data
+
+    def _detail_snapshot(self, images):
+        """Detail fields that only change together with ``updated_at``."""
+        return {
             "id": self.id,
             "seller_id": self.seller_id,
-            "seller": self.seller.to_public_dict() if self.seller else None,
             "title": self.title,
             "description": self.description,
             "category": self.category,
@@ -119,33 +154,74 @@ class AuctionItem(db.Model):
             "buyout_price": self.buyout_price,
             "current_price": self.current_price,
             "bid_count": self.bid_count,
-            "view_count": self.view_count,
             "like_count": self.like_count,
             "start_time": ensure_utc(self.start_time).isoformat() if self.start_time else None,
             "end_time": ensure_utc(self.end_time).isoformat() if self.end_time else None,
             "status": self.status,
             "winner_id": self.winner_id,
-            "images": [img.to_dict() for img in self.images.order_by(ItemImage.sort_order)],
+            "images": [img.to_dict() for img in images],
             "created_at": ensure_utc(self.created_at).isoformat(),
             "updated_at": ensure_utc(self.updated_at).isoformat(),
         }
-        # Reserve price is only visible to the seller
-        if include_reserve:
-            data["reserve_price"] = self.reserve_price
-        else:
-            # Show whether reserve price has been met
-            data["reserve_met"] = self._is_reserve_met()
-            data["has_reserve"] = self.reserve_price is not None
-        return data
 
     def _is_reserve_met(self):
         if self.reserve_price is None:
             return True  # No reserve means always met
         return self.current_price >= self.reserve_price
 
+    def to_live_dict(self):
+        """Fields that change while an auction runs, pushed to live streams."""
+        return {
+            "id": self.id,
+            "current_price": self.current_price,
+            "bid_count": self.bid_count,
+            "end_time": ensure_utc(self.end_time).isoformat() if self.end_time else None,
+            "status": self.status,
+            "winner_id": self.winner_id,
+            "reserve_met": self._is_reserve_met(),
+        }
+
     def to_card_dict(self):
         """Minimal dict for list/card display."""
-        first_image = self.images.order_by(ItemImage.sort_order).first()
+        return AuctionItem.to_card_dicts([self])[0]
+
+    @staticmethod
+    def to_card_dicts(items):
+        """Card dicts for a page of items.
+
+        Cards are cached per ``(id, updated_at)``; first images are loaded
+        for the misses only, and seller profiles come from the profile
+        cache. View counts, which change without touching ``updated_at``,
+        and seller profiles are overlaid on every call.
+        """
+        snapshots = {}
+        missing = []
+        for item in items:
+            snapshot = item_snapshot_cache.get(("card", item.id, item.updated_at))
+            if snapshot is None:
+                missing.append(item)
+            else:
+                snapshots[item.id] = snapshot
+        if missing:
+            generation = item_snapshot_cache.generation
+            first_images = load_first_images(item.id for item in missing)
+            for item in missing:
+                snapshot = item._card_snapshot(first_images.get(item.id))
+                item_snapshot_cache.set(("card", item.id, item.updated_at), snapshot, generation)
+                snapshots[item.id] = snapshot
+
+        sellers = load_public_users(item.seller_id for item in items)
+        pending_views = view_counter.pending
+        return [
+            {
+                **snapshots[item.id],
+                "view_count": (item.view_count or 0) + pending_views(item.id),
+                "seller": sellers.get(item.seller_id),
+            }
+            for item in items
+        ]
+
+    def _card_snapshot(self, image_url):
         return {
             "id": self.id,
             "title": self.title,
@@ -155,12 +231,11 @@ class AuctionItem(db.Model):
             "starting_price": self.starting_price,
             "buyout_price": self.buyout_price,
             "bid_count": self.bid_count,
-            "view_count": self.view_count,
             "like_count": self.like_count,
             "end_time": ensure_utc(self.end_time).isoformat() if self.end_time else None,
             "status": self.status,
-            "image_url": first_image.image_url if first_image else None,
-            "seller": self.seller.to_public_dict() if self.seller else None,
+            "image_url": image_url,
+            "thumb_url": variant_url(image_url, "thumb"),
             "reserve_met": self._is_reserve_met(),
             "has_reserve": self.reserve_price is not None,
         }
@@ -173,13 +248,16 @@ class ItemImage(db.Model):
     item_id = db.Column(
         db.Integer, db.ForeignKey("auction_items.id"), nullable=False, index=True
     )
-    image_url = db.Column(db.String(256), nullable=False)
+    # Indexed for the reference check of upload garbage collection
+    image_url = db.Column(db.String(256), nullable=False, index=True)
     sort_order = db.Column(db.Integer, default=0)
 
     def to_dict(self):
         return {
             "id": self.id,
             "image_url": self.image_url,
+            "thumb_url": variant_url(self.image_url, "thumb"),
+            "medium_url": variant_url(self.image_url, "medium"),
             "sort_order": self.sort_order,
         }
 
@@ -206,13 +284,19 @@ class ItemLike(db.Model):
 
 class Bid(db.Model):
     __tablename__ = "bids"
+    __table_args__ = (
+        # Bid history is read newest-first per item, incrementally by id
+        db.Index("ix_bids_item_id_id", "item_id", "id"),
+        # Covers the per-user max-bid aggregation of my-bids
+        db.Index("ix_bids_bidder_item_amount", "bidder_id", "item_id", "amount"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(
-        db.Integer, db.ForeignKey("auction_items.id"), nullable=False, index=True
+        db.Integer, db.ForeignKey("auction_items.id"), nullable=False
     )
     bidder_id = db.Column(
-        db.Integer, db.ForeignKey("users.id"), nullable=False, index=True
+        db.Integer, db.ForeignKey("users.id"), nullable=False
     )
     amount = db.Column(db.Float, nullable=False)
     created_at = db.Column(
@@ -220,14 +304,23 @@ class Bid(db.Model):
     )
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "item_id": self.item_id,
-            "bidder_id": self.bidder_id,
-            "bidder": self.bidder.to_public_dict() if self.bidder else None,
-            "amount": self.amount,
-            "created_at": ensure_utc(self.created_at).isoformat(),
-        }
+        return Bid.to_dicts([self])[0]
+
+    @staticmethod
+    def to_dicts(bids):
+        """Dicts for a list of bids, with bidder profiles loaded in one query."""
+        bidders = load_public_users(b.bidder_id for b in bids)
+        return [
+            {
+                "id": b.id,
+                "item_id": b.item_id,
+                "bidder_id": b.bidder_id,
+                "bidder": bidders.get(b.bidder_id),
+                "amount": b.amount,
+                "created_at": ensure_utc(b.created_at).isoformat(),
+            }
+            for b in bids
+        ]
 
 
 class Notification(db.Model):
@@ -266,6 +359,29 @@ class Notification(db.Model):
         }
 
 
+class OutboxEvent(db.Model):
+    """A compact notification event written in the request's transaction.
+
+    The notification worker expands each event into per-user Notification
+    rows later, off the request path (see app/outbox.py).
+    """
+
+    __tablename__ = "notification_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = db.Column(
+        db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+        nullable=False, index=True,
+    )
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(
+        db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+
 class Comment(db.Model):
     __tablename__ = "comments"
 
@@ -286,14 +402,23 @@ class Comment(db.Model):
     item = db.relationship("AuctionItem", foreign_keys=[item_id])
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "item_id": self.item_id,
-            "user_id": self.user_id,
-            "user": self.user.to_public_dict() if self.user else None,
-            "content": self.content,
-            "created_at": ensure_utc(self.created_at).isoformat(),
-        }
+        return Comment.to_dicts([self])[0]
+
+    @staticmethod
+    def to_dicts(comments):
+        """Dicts for a list of comments, with commenter profiles loaded in one query."""
+        users = load_public_users(c.user_id for c in comments)
+        return [
+            {
+                "id": c.id,
+                "item_id": c.item_id,
+                "user_id": c.user_id,
+                "user": users.get(c.user_id),
+                "content": c.content,
+                "created_at": ensure_utc(c.created_at).isoformat(),
+            }
+            for c in comments
+        ]
 
 
 class Transaction(db.Model):
@@ -330,3 +455,85 @@ class Transaction(db.Model):
             "created_at": ensure_utc(self.created_at).isoformat(),
             "completed_at": ensure_utc(self.completed_at).isoformat() if self.completed_at else None,
         }
+
+
+class StoredFile(db.Model):
+    """An uploaded file, named by its content hash and shared by identical uploads."""
+
+    __tablename__ = "stored_files"
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(128), unique=True, nullable=False)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    # Number of ItemImage rows and avatars pointing at the file
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # Set while ref_count is 0; garbage collection waits out a grace period
+    unreferenced_since = db.Column(db.DateTime(timezone=True), index=True)
+    created_at = db.Column(
+        db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+
+def load_public_users(user_ids):
+    """Public profiles for ``user_ids``, keyed by id.
+
+    Profiles come from the process-wide cache; the misses are loaded with
+    one query and cached. ``update_profile`` discards a user's entry.
+    """
+    profiles = {}
+    missing = set()
+    for user_id in set(user_ids):
+        profile = public_user_cache.get(user_id)
+        if profile is None:
+            missing.add(user_id)
+        else:
+            profiles[user_id] = profile
+    if not missing:
+        return profiles
+    generation = public_user_cache.generation
+    rows = (
+        db.session.query(User.id, User.nickname, User.avatar_url)
+        .filter(User.id.in_(missing))
+        .all()
+    )
+    for row in rows:
+        profile = {"id": row.id, "nickname": row.nickname, "avatar_url": row.avatar_url}
+        public_user_cache.set(row.id, profile, generation)
+        profiles[row.id] = profile
+    return profiles
+
+
+def load_first_images(item_ids):
+    """First image (by sort_order) of each item in one query, keyed by item id."""
+    item_ids = set(item_ids)
+    if not item_ids:
+        return {}
+    ranked = (
+        db.select(
+            ItemImage.item_id,
+            ItemImage.image_url,
+            db.func.row_number()
+            .over(partition_by=ItemImage.item_id, order_by=(ItemImage.sort_order, ItemImage.id))
+            .label("rn"),
+        )
+        .where(ItemImage.item_id.in_(item_ids))
+        .subquery()
+    )
+    rows = db.session.execute(
+        db.select(ranked.c.item_id, ranked.c.image_url).where(ranked.c.rn == 1)
+    )
+    return {item_id: image_url for item_id, image_url in rows}
+
+
+def load_images(item_ids):
+    """All images of each item, ordered, in one query, keyed by item id."""
+    item_ids = set(item_ids)
+    if not item_ids:
+        return {}
+    images = {}
+    for img in (
+        ItemImage.query.filter(ItemImage.item_id.in_(item_ids))
+        .order_by(ItemImage.item_id, ItemImage.sort_order, ItemImage.id)
+    ):
+        images.setdefault(img.item_id, []).append(img)
+    return images
@@ -0,0 +1,366 @@
+"""通知发件箱：请求和结束拍卖时只在同一事务里追加一条紧凑事件，由后台 worker 批量展开为逐用户通知。
+
+批量导入也经由发件箱把新拍品的截止时间交给 leader 的到期队列（导入命令不在进程总线上）。
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import event
+
+from app import db
+from app.bus import process_bus
+from app.database import RoutingSession
+from app.models import AuctionItem, Bid, Notification, OutboxEvent, ensure_utc
+
+# 每批最多展开的事件数
+BATCH_SIZE = 500
+# 没有唤醒时的兜底轮询间隔
+POLL_SECONDS = 5
+# 展开失败的事件按指数退避重试，超过次数后保留在表中等待人工处理
+MAX_ATTEMPTS = 8
+MAX_BACKOFF_SECONDS = 300
+# 积压超过该数量时记录告警，worker 最多每隔 BACKLOG_CHECK_SECONDS 检查一次
+BACKLOG_WARNING = 10000
+BACKLOG_CHECK_SECONDS = 60
+
+KIND_OUTBID = "outbid"
+KIND_BUYOUT = "buyout"
+KIND_AUCTION_ENDED = "auction_ended"
+KIND_TRANSACTION_CONFIRMED = "transaction_confirmed"
+KIND_SCHEDULE_EXPIRY = "schedule_expiry"
+
+
+def enqueue(kind, **payload):
+    """Append one event to the current transaction; it's expanded after commit."""
+    db.session.add(OutboxEvent(kind=kind, payload=payload))
+    db.session.info["outbox_pending"] = True
+
+
+def enqueue_many(kind, payloads, now):
+    """Bulk variant of ``enqueue`` for the auction finalizer."""
+    if not payloads:
+        return
+    db.session.execute(
+        db.insert(OutboxEvent),
+        [
+            {"kind": kind, "payload": payload, "attempts": 0,
+             "next_attempt_at": now, "created_at": now}
+            for payload in payloads
+        ],
+    )
+    db.session.info["outbox_pending"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _wake_after_commit(session):
+    if session.info.pop("outbox_pending", False):
+        notification_worker.wake()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop("outbox_pending", None)
+
+
+def _row(user_id, ntype, title, content, item_id, created_at):
+    return {
+        "user_id": user_id,
+        "type": ntype,
+        "title": title,
+        "content": content,
+        "related_item_id": item_id,
+        "is_read": False,
+        "created_at": created_at,
+    }
+
+
+def _expand_outbid(events):
+    return [
+        _row(
+            e.payload["user_id"],
+            Notification.TYPE_OUTBID,
+            "出价已被超越",
+            f"您在「{e.payload['title']}」的出价已被超越，当前最高价 {e.payload['amount']:.2f} 元",
+            e.payload["item_id"],
+            e.created_at,
+        )
+        for e in events
+    ]
+
+
+def _expand_buyout(events):
+    rows = []
+    for e in events:
+        p = e.payload
+        rows.append(_row(
+            p["seller_id"],
+            Notification.TYPE_AUCTION_SOLD,
+            "拍品已成交",
+            f"恭喜！「{p['title']}」已被一口价买下，成交价 {p['price']:.2f} 元",
+            p["item_id"],
+            e.created_at,
+        ))
+        rows.append(_row(
+            p["buyer_id"],
+            Notification.TYPE_AUCTION_WON,
+            "竞拍成功",
+            f"恭喜！您以一口价 {p['price']:.2f} 元拍下「{p['title']}」",
+            p["item_id"],
+            e.created_at,
+        ))
+    return rows
+
+
+def _expand_auction_ended(events):
+    # Every bidder of a reserve-not-met item hears about it: one query for
+    # the whole batch
+    reserve_missed = [
+        e.payload["item_id"] for e in events
+        if e.payload["status"] == AuctionItem.STATUS_ENDED_UNSOLD and e.payload["bid_count"] > 0
+    ]
+    bidders = defaultdict(list)
+    if reserve_missed:
+        for item_id, bidder_id in (
+            db.session.query(Bid.item_id, Bid.bidder_id)
+            .filter(Bid.item_id.in_(reserve_missed))
+            .distinct()
+        ):
+            bidders[item_id].append(bidder_id)
+
+    rows = []
+    for e in events:
+        p = e.payload
+        if p["status"] == AuctionItem.STATUS_ENDED_WON:
+            rows.append(_row(
+                p["winner_id"],
+                Notification.TYPE_AUCTION_WON,
+                "竞拍成功",
+                f"恭喜！您以 {p['price']:.2f} 元拍下「{p['title']}」",
+                p["item_id"],
+                e.created_at,
+            ))
+            rows.append(_row(
+                p["seller_id"],
+                Notification.TYPE_AUCTION_SOLD,
+                "拍品已成交",
+                f"恭喜！「{p['title']}」已成交，成交价 {p['price']:.2f} 元",
+                p["item_id"],
+                e.created_at,
+            ))
+        elif p["bid_count"] == 0:
+            rows.append(_row(
+                p["seller_id"],
+                Notification.TYPE_AUCTION_UNSOLD,
+                "拍品流拍",
+                f"「{p['title']}」已结束，无人出价",
+                p["item_id"],
+                e.created_at,
+            ))
+        else:
+            rows.append(_row(
+                p["seller_id"],
+                Notification.TYPE_RESERVE_NOT_MET,
+                "拍品流拍",
+                f"「{p['title']}」已结束，最高出价 {p['price']:.2f} 元未达到保留价",
+                p["item_id"],
+                e.created_at,
+            ))
+            for bidder_id in bidders[p["item_id"]]:
+                rows.append(_row(
+                    bidder_id,
+                    Notification.TYPE_RESERVE_NOT_MET,
+                    "拍品流拍",
+                    f"「{p['title']}」已结束，最高出价未达到卖家设定的保留价",
+                    p["item_id"],
+                    e.created_at,
+                ))
+    return rows
+
+
+def _expand_transaction_confirmed(events):
+    return [
+        _row(
+            e.payload["user_id"],
+            Notification.TYPE_TRANSACTION_CONFIRMED,
+            "交易确认",
+            f"对方已确认「{e.payload['title']}」的交易完成",
+            e.payload["item_id"],
+            e.created_at,
+        )
+        for e in events
+    ]
+
+
+def _expand_schedule_expiry(events):
+    # The worker runs in the scheduler leader, which owns the expiry queue
+    from app.scheduler import expiry_queue
+
+    expiry_queue.schedule_local(
+        (item_id, datetime.fromisoformat(end_time))
+        for e in events
+        for item_id, end_time in e.payload["deadlines"]
+    )
+    return []
+
+
+EXPANDERS = {
+    KIND_OUTBID: _expand_outbid,
+    KIND_BUYOUT: _expand_buyout,
+    KIND_AUCTION_ENDED: _expand_auction_ended,
+    KIND_TRANSACTION_CONFIRMED: _expand_transaction_confirmed,
+    KIND_SCHEDULE_EXPIRY: _expand_schedule_expiry,
+}
+
+
+class NotificationWorker:
+    """Expands outbox events into Notification rows in batches.
+
+    Runs only in the scheduler leader. Commits anywhere call ``wake`` (via
+    the session hook above), which is relayed to the leader over the
+    process bus; a slow poll covers lost wake-ups. Each batch inserts all
+    its notifications and deletes its events in one transaction, so an
+    event is delivered exactly once. When a kind's batch fails to expand,
+    its events are retried one at a time and only the failing ones are
+    charged an attempt and backed off exponentially.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.events = 0
+        self.notifications = 0
+        self.failures = 0
+        self.last_batch_ms = 0.0
+        self._backlog_checked = 0.0
+
+    def wake(self):
+        self._wake_local()
+        process_bus.broadcast("outbox", None)
+
+    def _wake_local(self):
+        if self._thread is not None:
+            self._wake.set()
+
+    def start(self, app):
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+                try:
+                    # Keep going while full batches show there is a backlog
+                    while self.drain(app) == BATCH_SIZE:
+                        pass
+                except Exception:
+                    app.logger.exception("Notification outbox batch failed")
+                if time.monotonic() - self._backlog_checked >= BACKLOG_CHECK_SECONDS:
+                    self._backlog_checked = time.monotonic()
+                    try:
+                        self._warn_on_backlog(app)
+                    except Exception:
+                        app.logger.exception("Notification outbox backlog check failed")
+
+        self._thread = threading.Thread(target=run, name="notification-outbox", daemon=True)
+        self._thread.start()
+        self._wake.set()  # Deliver whatever piled up while nobody was leader
+
+    def drain(self, app):
+        """Expand one batch of due events; returns how many were taken."""
+        started = time.perf_counter()
+        with app.app_context():
+            now = datetime.now(timezone.utc)
+            events = (
+                OutboxEvent.query.filter(
+                    OutboxEvent.attempts < MAX_ATTEMPTS,
+                    OutboxEvent.next_attempt_at <= now,
+                )
+                .order_by(OutboxEvent.id)
+                .limit(BATCH_SIZE)
+                .all()
+            )
+            if not events:
+                return 0
+
+            by_kind = defaultdict(list)
+            for e in events:
+                by_kind[e.kind].append(e)
+            rows, done, failed = [], [], 0
+            for kind, group in by_kind.items():
+                try:
+                    rows.extend(EXPANDERS[kind](group))
+                    done.extend(e.id for e in group)
+                    continue
+                except Exception:
+                    app.logger.warning(
+                        "Expanding %d %r outbox event(s) failed; retrying one by one",
+                        len(group), kind,
+                    )
+                # Isolate the bad events so they don't take the rest of the
+                # batch down with them
+                for e in group:
+                    try:
+                        rows.extend(EXPANDERS[kind]([e]))
+                        done.append(e.id)
+                    except Exception as exc:
+                        app.logger.exception("Failed to expand outbox event %d (%r)", e.id, kind)
+                        failed += 1
+                        e.attempts += 1
+                        e.last_error = repr(exc)[:500]
+                        e.next_attempt_at = now + timedelta(
+                            seconds=min(2 ** e.attempts, MAX_BACKOFF_SECONDS)
+                        )
+
+            if rows:
+                db.session.execute(db.insert(Notification), rows)
+            if done:
+                db.session.execute(db.delete(OutboxEvent).where(OutboxEvent.id.in_(done)))
+            db.session.commit()
+
+        with self._lock:
+            self.batches += 1
+            self.events += len(done)
+            self.notifications += len(rows)
+            self.failures += failed
+            self.last_batch_ms = round((time.perf_counter() - started) * 1000, 2)
+        return len(events)
+
+    def _warn_on_backlog(self, app):
+        with app.app_context():
+            pending = OutboxEvent.query.filter(OutboxEvent.attempts < MAX_ATTEMPTS).count()
+        if pending > BACKLOG_WARNING:
+            app.logger.warning("Notification outbox backlog: %d events", pending)
+
+    def stats(self):
+        """Backlog from the database plus this process's worker counters."""
+        live = OutboxEvent.attempts < MAX_ATTEMPTS
+        pending, dead, oldest = db.session.query(
+            db.func.count(db.case((live, 1))),
+            db.func.count(db.case((~live, 1))),
+            db.func.min(db.case((live, OutboxEvent.created_at))),
+        ).one()
+        lag = (
+            (datetime.now(timezone.utc) - ensure_utc(oldest)).total_seconds()
+            if oldest else 0.0
+        )
+        with self._lock:
+            return {
+                "pending": pending,
+                "dead": dead,
+                "lag_seconds": round(lag, 3),
+                "worker_running": self._thread is not None,
+                "batches": self.batches,
+                "events": self.events,
+                "notifications": self.notifications,
+                "failures": self.failures,
+                "last_batch_ms": self.last_batch_ms,
+            }
+
+
+notification_worker = NotificationWorker()
+process_bus.register("outbox", lambda _payload: notification_worker._wake_local())
@@ -0,0 +1,64 @@
+"""游标（keyset）分页：按排序键定位下一页，避免 OFFSET 深翻页和每次 COUNT(*)。"""
+import base64
+import json
+from datetime import datetime
+
+from app import db
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def order_by_keys(keys):
+    """ORDER BY clauses for ``keys``, a list of ``(expr, descending)``."""
+    return [expr.desc() if descending else expr.asc() for expr, descending in keys]
+
+
+def encode_cursor(values):
+    plain = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(plain, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, keys):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise InvalidCursor(cursor)
+        return [
+            datetime.fromisoformat(v) if isinstance(expr.type, db.DateTime) else v
+            for v, (expr, _) in zip(values, keys)
+        ]
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def keyset_paginate(query, keys, cursor, per_page):
+    """Return ``(objects, next_cursor)`` for the page after ``cursor``.
+
+    ``keys`` must end with a unique column (the id) so the order is total,
+    and all keys share one direction so the position test is a single row
+    value comparison that can use an index. ``next_cursor`` is None on the
+    last page. ``per_page`` below 1 is treated as 1.
+    """
+    per_page = max(1, per_page)
+    descending = keys[0][1]
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        row = db.tuple_(*[expr for expr, _ in keys])
+        bound = db.tuple_(*[db.literal(v, expr.type) for v, (expr, _) in zip(values, keys)])
+        query = query.filter(row < bound if descending else row > bound)
+
+    rows = (
+        query.add_columns(*[expr for expr, _ in keys])
+        .order_by(*order_by_keys(keys))
+        .limit(per_page + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(list(rows[-1][1:]))
+    return [row[0] for row in rows], next_cursor
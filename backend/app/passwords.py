@@ -0,0 +1,92 @@
+"""密码哈希：bcrypt 在独立的进程池中计算，排队过多时直接拒绝，避免登录高峰占满请求线程。"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+
+class HasherBusy(Exception):
+    """Too many hashing jobs are queued; the request should be retried later."""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a small process pool with a bounded queue.
+
+    At most ``max_pending`` jobs (running plus queued) are accepted per
+    process, a small fraction of its request threads; beyond that
+    ``hash``/``verify`` raise ``HasherBusy`` at once instead of tying up
+    a request thread. ``workers = 0`` hashes on the calling thread, still
+    subject to the same limit. New hashes use ``rounds``;
+    ``needs_rehash`` tells whether a stored hash used another cost so
+    login can upgrade it.
+    """
+
+    def __init__(self, workers=2, max_pending=4, rounds=12):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def hash(self, password):
+        return self._run(_hash, password.encode("utf-8"), self.rounds)
+
+    def verify(self, password, hashed):
+        return self._run(_check, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed):
+        # "$2b$12$..." -> 12
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy()
+            self._pending += 1
+            if self._pool is None and self.workers > 0:
+                # Started lazily so each gunicorn worker gets its own pool;
+                # forkserver keeps the request threads out of the children
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context(
+                    "forkserver" if "forkserver" in methods else "spawn"
+                )
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=context)
+            pool = self._pool
+        try:
+            if pool is None:
+                return fn(*args)
+            return pool.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+password_hasher = PasswordHasher()
@@ -1,7 +1,7 @@
 import re
+from functools import wraps
 
-import bcrypt
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import (
     create_access_token,
     jwt_required,
@@ -9,11 +9,36 @@ from flask_jwt_extended import (
 )
 
 from app import db
+from app.cache import listing_cache, public_user_cache
 from app.models import User
+from app.passwords import HasherBusy, password_hasher
+from app.storage import release_files, retain_files
 
 auth_bp = Blueprint("auth", __name__)
 
 EMAIL_REGEX = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+# 密码哈希排队已满时，建议客户端等待的秒数
+HASHER_RETRY_AFTER = 2
+
+
+def admin_required(fn):
+    """Restrict an endpoint to the users listed in ``ADMIN_USER_IDS``."""
+
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if int(get_jwt_identity()) not in current_app.config["ADMIN_USER_IDS"]:
+            return jsonify({"errors": ["无权访问"]}), 403
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+@auth_bp.errorhandler(HasherBusy)
+def hasher_busy(_error):
+    response = jsonify({"errors": ["服务繁忙，请稍后重试"]})
+    response.headers["Retry-After"] = str(HASHER_RETRY_AFTER)
+    return response, 503
 
 
 @auth_bp.route("/register", methods=["POST"])
@@ -40,9 +65,7 @@ def register():
         return jsonify({"errors": ["该邮箱已被注册"]}), 409
 
     # Create user
-    password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode(
-        "utf-8"
-    )
+    password_hash = password_hasher.hash(password)
     user = User(email=email, password_hash=password_hash, nickname=nickname)
     db.session.add(user)
     db.session.commit()
@@ -63,11 +86,17 @@ def login():
         return jsonify({"errors": ["请输入邮箱和密码"]}), 400
 
     user = User.query.filter_by(email=email).first()
-    if not user or not bcrypt.checkpw(
-        password.encode("utf-8"), user.password_hash.encode("utf-8")
-    ):
+    if not user or not password_hasher.verify(password, user.password_hash):
         return jsonify({"errors": ["邮箱或密码错误"]}), 401
 
+    # Upgrade hashes made with a different cost factor while we have the password
+    if password_hasher.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = password_hasher.hash(password)
+            db.session.commit()
+        except HasherBusy:
+            pass  # Try again on a later login
+
     access_token = create_access_token(identity=str(user.id))
     return jsonify({"token": access_token, "user": user.to_dict()})
 
@@ -98,10 +127,17 @@ def update_profile():
             return jsonify({"errors": ["昵称需要2-20个字符"]}), 400
         user.nickname = nickname
 
-    if "avatar_url" in data:
+    if "avatar_url" in data and data["avatar_url"] != user.avatar_url:
+        release_files([user.avatar_url])
+        retain_files([data["avatar_url"]])
         user.avatar_url = data["avatar_url"]
 
+    public_changed = db.inspect(user).modified
     db.session.commit()
+    if public_changed:
+        # Cards in cached listings embed the seller's profile
+        public_user_cache.discard(user_id)
+        listing_cache.invalidate()
     return jsonify({"user": user.to_dict()})
 
 
@@ -117,16 +153,12 @@ def change_password():
     old_password = data.get("old_password", "")
     new_password = data.get("new_password", "")
 
-    if not bcrypt.checkpw(
-        old_password.encode("utf-8"), user.password_hash.encode("utf-8")
-    ):
+    if not password_hasher.verify(old_password, user.password_hash):
         return jsonify({"errors": ["原密码错误"]}), 400
 
     if len(new_password) < 6:
         return jsonify({"errors": ["新密码至少需要6位"]}), 400
 
-    user.password_hash = bcrypt.hashpw(
-        new_password.encode("utf-8"), bcrypt.gensalt()
-    ).decode("utf-8")
+    user.password_hash = password_hasher.hash(new_password)
     db.session.commit()
     return jsonify({"message": "密码修改成功"})
@@ -4,11 +4,18 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app import db
-from app.models import AuctionItem, Bid, Notification, Transaction, ensure_utc
+from app.bidding import MAX_CONFLICT_RETRIES, claim_bid, item_sequencer
+from app.cache import listing_cache
+from app.etags import item_etag, not_modified, with_etag
+from app.events import item_events
+from app.models import AuctionItem, Bid, Transaction, ensure_utc
+from app.outbox import KIND_BUYOUT, KIND_OUTBID, enqueue
+from app.scheduler import expiry_queue
 
 bids_bp = Blueprint("bids", __name__)
 
 ANTI_SNIPE_MINUTES = 5
+MAX_BIDS_PAGE = 100
 
 
 @bids_bp.route("/item/<int:item_id>", methods=["POST"])
@@ -17,106 +24,121 @@ def place_bid(item_id):
     user_id = int(get_jwt_identity())
     data = request.get_json() or {}
 
-    item = db.session.get(AuctionItem, item_id)
-    if not item:
-        return jsonify({"errors": ["拍品不存在"]}), 404
-
-    if item.status != AuctionItem.STATUS_ACTIVE:
-        return jsonify({"errors": ["该拍品未在拍卖中"]}), 400
-
-    if item.seller_id == user_id:
-        return jsonify({"errors": ["不能对自己的拍品出价"]}), 400
-
-    # Check if auction has ended
-    now = datetime.now(timezone.utc)
-    if item.end_time and now >= ensure_utc(item.end_time):
-        return jsonify({"errors": ["拍卖已结束"]}), 400
-
     try:
         amount = float(data.get("amount", 0))
     except (ValueError, TypeError):
         return jsonify({"errors": ["出价格式错误"]}), 400
 
-    min_bid = item.current_price + item.increment
-    if item.bid_count == 0:
-        min_bid = item.starting_price  # First bid only needs to match starting price
-
-    if amount < min_bid:
-        return jsonify({"errors": [f"出价至少为 {min_bid:.2f} 元"]}), 400
-
-    # Check buyout
-    is_buyout = item.buyout_price and amount >= item.buyout_price
-
-    # Record the previous highest bidder for notification
-    previous_highest_bidder_id = None
-    if item.bid_count > 0:
-        previous_bid = (
-            Bid.query.filter_by(item_id=item.id)
-            .order_by(Bid.amount.desc())
-            .first()
-        )
-        if previous_bid and previous_bid.bidder_id != user_id:
-            previous_highest_bidder_id = previous_bid.bidder_id
+    # Bids on the same item are validated and written one at a time
+    with item_sequencer.hold(item_id):
+        for _ in range(MAX_CONFLICT_RETRIES):
+            item = db.session.get(AuctionItem, item_id)
+            if not item:
+                return jsonify({"errors": ["拍品不存在"]}), 404
+
+            if item.status != AuctionItem.STATUS_ACTIVE:
+                return jsonify({"errors": ["该拍品未在拍卖中"]}), 400
+
+            if item.seller_id == user_id:
+                return jsonify({"errors": ["不能对自己的拍品出价"]}), 400
+
+            # Check if auction has ended
+            now = datetime.now(timezone.utc)
+            if item.end_time and now >= ensure_utc(item.end_time):
+                return jsonify({"errors": ["拍卖已结束"]}), 400
+
+            min_bid = item.current_price + item.increment
+            if item.bid_count == 0:
+                min_bid = item.starting_price  # First bid only needs to match starting price
+
+            if amount < min_bid:
+                return jsonify({"errors": [f"出价至少为 {min_bid:.2f} 元"]}), 400
+
+            # Check buyout
+            is_buyout = bool(item.buyout_price and amount >= item.buyout_price)
+
+            # Record the previous highest bidder for notification
+            previous_highest_bidder_id = item.leading_bidder_id
+            if previous_highest_bidder_id is None and item.bid_count > 0:
+                # Rows from before leader tracking; see `flask repair-leaders`
+                previous_bid = (
+                    Bid.query.filter_by(item_id=item.id)
+                    .order_by(Bid.amount.desc())
+                    .first()
+                )
+                previous_highest_bidder_id = previous_bid.bidder_id if previous_bid else None
+            if previous_highest_bidder_id == user_id:
+                previous_highest_bidder_id = None
+
+            # Anti-sniping: extend auction if bid placed within last 5 minutes
+            new_end_time = None
+            if item.end_time and (ensure_utc(item.end_time) - now) <= timedelta(minutes=ANTI_SNIPE_MINUTES):
+                new_end_time = now + timedelta(minutes=ANTI_SNIPE_MINUTES)
+
+            bid = Bid(item_id=item.id, bidder_id=user_id, amount=amount, created_at=now)
+            db.session.add(bid)
+            db.session.flush()
+
+            final_price = item.buyout_price if is_buyout else amount
+            if claim_bid(
+                item,
+                bid,
+                final_price,
+                now,
+                end_time=new_end_time,
+                winner_id=user_id if is_buyout else None,
+            ):
+                break
+
+            # Another process bid first; re-read the item and validate again
+            db.session.rollback()
+        else:
+            return jsonify({"errors": ["出价人数过多，请稍后重试"]}), 409
+
+        # Handle buyout
+        if is_buyout:
+            # Create transaction
+            transaction = Transaction(
+                item_id=item.id,
+                seller_id=item.seller_id,
+                buyer_id=user_id,
+                final_price=item.buyout_price,
+            )
+            db.session.add(transaction)
+
+            enqueue(
+                KIND_BUYOUT,
+                item_id=item.id,
+                title=item.title,
+                seller_id=item.seller_id,
+                buyer_id=user_id,
+                price=item.buyout_price,
+            )
+
+        # Notify previous highest bidder they've been outbid
+        if previous_highest_bidder_id:
+            enqueue(
+                KIND_OUTBID,
+                user_id=previous_highest_bidder_id,
+                item_id=item.id,
+                title=item.title,
+                amount=amount,
+            )
+
+        db.session.commit()
 
-    # Create bid
-    bid = Bid(item_id=item.id, bidder_id=user_id, amount=amount, created_at=now)
-    db.session.add(bid)
-
-    # Update item
-    item.current_price = amount
-    item.bid_count += 1
-
-    # Anti-sniping: extend auction if bid placed within last 5 minutes
-    if item.end_time and (ensure_utc(item.end_time) - now) <= timedelta(minutes=ANTI_SNIPE_MINUTES):
-        item.end_time = now + timedelta(minutes=ANTI_SNIPE_MINUTES)
-
-    # Handle buyout
     if is_buyout:
-        item.current_price = item.buyout_price
-        item.status = AuctionItem.STATUS_ENDED_WON
-        item.winner_id = user_id
-
-        # Create transaction
-        transaction = Transaction(
-            item_id=item.id,
-            seller_id=item.seller_id,
-            buyer_id=user_id,
-            final_price=item.buyout_price,
-        )
-        db.session.add(transaction)
-
-        # Notify seller
-        _notify(
-            item.seller_id,
-            Notification.TYPE_AUCTION_SOLD,
-            "拍品已成交",
-            f"恭喜！「{item.title}」已被一口价买下，成交价 {item.buyout_price:.2f} 元",
-            item.id,
-        )
-        # Notify buyer
-        _notify(
-            user_id,
-            Notification.TYPE_AUCTION_WON,
-            "竞拍成功",
-            f"恭喜！您以一口价 {item.buyout_price:.2f} 元拍下「{item.title}」",
-            item.id,
-        )
-
-    # Notify previous highest bidder they've been outbid
-    if previous_highest_bidder_id:
-        _notify(
-            previous_highest_bidder_id,
-            Notification.TYPE_OUTBID,
-            "出价已被超越",
-            f"您在「{item.title}」的出价已被超越，当前最高价 {amount:.2f} 元",
-            item.id,
-        )
-
-    db.session.commit()
+        expiry_queue.discard(item.id)
+    elif new_end_time:
+        expiry_queue.schedule(item.id, new_end_time)
+    listing_cache.invalidate()
+
+    bid_data = bid.to_dict()
+    item_events.publish(item.id, "bid", {"bid": bid_data, "item": item.to_live_dict()})
 
     return jsonify(
         {
-            "bid": bid.to_dict(),
+            "bid": bid_data,
             "item": item.to_dict(),
         }
     )
@@ -124,24 +146,30 @@ def place_bid(item_id):
 
 @bids_bp.route("/item/<int:item_id>", methods=["GET"])
 def get_bids(item_id):
-    item = db.session.get(AuctionItem, item_id)
-    if not item:
+    etag = item_etag(item_id)
+    if etag is None:
         return jsonify({"errors": ["拍品不存在"]}), 404
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    # Newest first; accepted bids only ever raise the price, so this is also
+    # highest first. ?since_id= returns only bids the client hasn't seen.
+    query = Bid.query.filter(Bid.item_id == item_id)
+    since_id = request.args.get("since_id", type=int)
+    if since_id:
+        query = query.filter(Bid.id > since_id)
+    query = query.order_by(Bid.id.desc())
+
+    limit = request.args.get("limit", type=int)
+    if limit:
+        limit = min(max(limit, 1), MAX_BIDS_PAGE)
+        bids = query.limit(limit + 1).all()
+        has_more = len(bids) > limit
+        bids = bids[:limit]
+    else:
+        bids = query.all()
+        has_more = False
+
+    return with_etag(jsonify({"bids": Bid.to_dicts(bids), "has_more": has_more}), etag)
 
-    bids = (
-        Bid.query.filter_by(item_id=item_id)
-        .order_by(Bid.amount.desc())
-        .all()
-    )
-    return jsonify({"bids": [b.to_dict() for b in bids]})
-
-
-def _notify(user_id, ntype, title, content, item_id=None):
-    n = Notification(
-        user_id=user_id,
-        type=ntype,
-        title=title,
-        content=content,
-        related_item_id=item_id,
-    )
-    db.session.add(n)
@@ -2,7 +2,10 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app import db
+from app.etags import item_etag, not_modified, with_etag
+from app.events import item_events
 from app.models import Comment, AuctionItem
+from app.pagination import InvalidCursor, keyset_paginate, order_by_keys
 
 comments_bp = Blueprint("comments", __name__)
 
@@ -10,27 +13,42 @@ comments_bp = Blueprint("comments", __name__)
 @comments_bp.route("/<int:item_id>/comments", methods=["GET"])
 def list_comments(item_id):
     """获取拍品的留言列表"""
-    item = db.session.get(AuctionItem, item_id)
-    if not item:
+    etag = item_etag(item_id)
+    if etag is None:
         return jsonify({"errors": ["拍品不存在"]}), 404
+    cached = not_modified(etag)
+    if cached:
+        return cached
 
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 50, type=int)
-    per_page = min(per_page, 100)
+    per_page = max(1, min(per_page, 100))
+
+    query = Comment.query.filter_by(item_id=item_id)
+    keys = [(Comment.created_at, True), (Comment.id, True)]
 
-    pagination = (
-        Comment.query
-        .filter_by(item_id=item_id)
-        .order_by(Comment.created_at.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
+    # Cursor mode (opt-in with ?cursor=, empty for the first page)
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        try:
+            comments, next_cursor = keyset_paginate(query, keys, cursor, per_page)
+        except InvalidCursor:
+            return jsonify({"errors": ["无效的分页游标"]}), 400
+        data = {"comments": Comment.to_dicts(comments), "next_cursor": next_cursor}
+        if request.args.get("with_total", "").lower() == "true":
+            data["total"] = query.count()
+        return with_etag(jsonify(data), etag)
+
+    pagination = query.order_by(*order_by_keys(keys)).paginate(
+        page=page, per_page=per_page, error_out=False
     )
 
-    return jsonify({
-        "comments": [c.to_dict() for c in pagination.items],
+    return with_etag(jsonify({
+        "comments": Comment.to_dicts(pagination.items),
         "total": pagination.total,
         "page": pagination.page,
         "pages": pagination.pages,
-    })
+    }), etag)
 
 
 @comments_bp.route("/<int:item_id>/comments", methods=["POST"])
@@ -63,4 +81,7 @@ def create_comment(item_id):
     db.session.add(comment)
     db.session.commit()
 
-    return jsonify({"comment": comment.to_dict()}), 201
+    comment_data = comment.to_dict()
+    item_events.publish(item_id, "comment", {"comment": comment_data})
+
+    return jsonify({"comment": comment_data}), 201
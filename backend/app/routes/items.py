@@ -1,16 +1,29 @@
 from datetime import datetime, timezone, timedelta
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, g, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.exc import IntegrityError
 
 from app import db
-from app.models import AuctionItem, ItemImage, ItemLike
+from app.cache import liked_users_cache, listing_cache
+from app.counters import view_counter
+from app.etags import item_etag, not_modified, with_etag
+from app.events import item_events
+from app.models import AuctionItem, ItemImage, ItemLike, load_public_users
+from app.pagination import InvalidCursor, keyset_paginate, order_by_keys
+from app.routes.auth import admin_required
+from app.scheduler import expiry_queue
+from app.search import search_matches
+from app.storage import release_files, retain_files
 
 items_bp = Blueprint("items", __name__)
 
 VALID_CATEGORIES = ["electronics", "food", "daily", "other"]
 VALID_CONDITIONS = ["new", "like_new", "good", "fair"]
-VALID_SORT = ["newest", "ending_soon", "price_low", "most_bids"]
+VALID_SORT = ["newest", "ending_soon", "price_low", "most_bids", "relevance"]
+# 详情页内嵌的点赞用户数，更多的通过 /likes 分页获取
+LIKED_USERS_LIMIT = 20
+MAX_LIKED_USERS_PAGE = 100
 
 
 @items_bp.route("", methods=["POST"])
@@ -19,7 +32,7 @@ def create_item():
     user_id = int(get_jwt_identity())
     data = request.get_json() or {}
 
-    errors = _validate_item_data(data)
+    errors = validate_item_data(data)
     if errors:
         return jsonify({"errors": errors}), 400
 
@@ -40,10 +53,11 @@ def create_item():
     db.session.flush()  # Get the item ID
 
     # Add images
-    image_urls = data.get("image_urls", [])
-    for idx, url in enumerate(image_urls[:5]):
+    image_urls = data.get("image_urls", [])[:5]
+    for idx, url in enumerate(image_urls):
         img = ItemImage(item_id=item.id, image_url=url, sort_order=idx)
         db.session.add(img)
+    retain_files(image_urls)
 
     db.session.commit()
     return jsonify({"item": item.to_dict(include_reserve=True)}), 201
@@ -52,30 +66,68 @@ def create_item():
 @items_bp.route("", methods=["GET"])
 def list_items():
     """List active auction items with filtering and sorting."""
-    page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("per_page", 20, type=int)
-    per_page = min(per_page, 50)  # Cap at 50
+    params = _listing_params(request.args)
+    current_user_id = _get_current_user_id()
 
-    category = request.args.get("category")
-    sort = request.args.get("sort", "newest")
-    search = request.args.get("search", "").strip()
-    status = request.args.get("status", "all")
-    liked_only = request.args.get("liked_only", "").lower() == "true"
+    # Filter by liked items (must be logged in); such pages are per-user
+    liked_user_id = current_user_id if params["liked_only"] else None
 
+    # Everything else is the same for every visitor, so it's served from the
+    # shared cache and only per-user fields are overlaid afterwards
+    cache_key = None if liked_user_id else tuple(sorted(params.items()))
+    data = listing_cache.get(cache_key) if cache_key else None
+    if data is None:
+        generation = listing_cache.generation
+        try:
+            data = _build_listing(params, liked_user_id)
+        except InvalidCursor:
+            return jsonify({"errors": ["无效的分页游标"]}), 400
+        if cache_key:
+            listing_cache.set(cache_key, data, generation)
+
+    # Attach is_liked for logged-in users
+    items = _attach_is_liked([dict(card) for card in data["items"]], current_user_id)
+    return jsonify({**data, "items": items})
+
+
+@items_bp.route("/cache-stats", methods=["GET"])
+@admin_required
+def listing_cache_stats():
+    return jsonify(listing_cache.stats())
+
+
+def _listing_params(args):
+    """Normalized list_items query parameters (also the cache key)."""
+    category = args.get("category")
+    return {
+        "page": args.get("page", 1, type=int),
+        "per_page": max(1, min(args.get("per_page", 20, type=int), 50)),  # Cap at 50
+        "category": category if category in VALID_CATEGORIES else None,
+        "sort": args.get("sort", "newest"),
+        "search": args.get("search", "").strip(),
+        "status": args.get("status", "all"),
+        "liked_only": args.get("liked_only", "").lower() == "true",
+        # Cursor mode (opt-in with ?cursor=, empty for the first page)
+        "cursor": args.get("cursor"),
+        "with_total": args.get("with_total", "").lower() == "true",
+    }
+
+
+def _build_listing(params, liked_user_id=None):
+    """Response payload for list_items, without per-user fields."""
     query = AuctionItem.query
 
-    # Filter by liked items (must be logged in)
-    current_user_id = _get_current_user_id()
-    if liked_only and current_user_id:
+    if liked_user_id:
         liked_item_ids = [
             row[0]
             for row in db.session.query(ItemLike.item_id)
-            .filter(ItemLike.user_id == current_user_id)
+            .filter(ItemLike.user_id == liked_user_id)
             .all()
         ]
         query = query.filter(AuctionItem.id.in_(liked_item_ids))
 
     # Filter by status
+    status = params["status"]
     if status == "active":
         query = query.filter(AuctionItem.status == AuctionItem.STATUS_ACTIVE)
     elif status == "ended":
@@ -92,11 +144,15 @@ def list_items():
         )
 
     # Filter by category
-    if category and category in VALID_CATEGORIES:
-        query = query.filter(AuctionItem.category == category)
-
-    # Search
-    if search:
+    if params["category"]:
+        query = query.filter(AuctionItem.category == params["category"])
+
+    # Search: full-text index when available, LIKE scan otherwise
+    search = params["search"]
+    matches = search_matches(current_app, search) if search else None
+    if matches is not None:
+        query = query.join(matches, matches.c.item_id == AuctionItem.id)
+    elif search:
         query = query.filter(
             db.or_(
                 AuctionItem.title.ilike(f"%{search}%"),
@@ -104,49 +160,66 @@ def list_items():
             )
         )
 
-    # Sort
-    if sort == "ending_soon":
-        query = query.order_by(AuctionItem.end_time.asc())
+    # Sort; every order ends with id so pages are stable under ties
+    sort = params["sort"]
+    if sort == "relevance" and matches is not None:
+        keys = [(matches.c.rank, False), (AuctionItem.id, False)]
+    elif sort == "ending_soon":
+        keys = [(AuctionItem.end_time, False), (AuctionItem.id, False)]
     elif sort == "price_low":
-        query = query.order_by(AuctionItem.current_price.asc())
+        keys = [(AuctionItem.current_price, False), (AuctionItem.id, False)]
     elif sort == "most_bids":
-        query = query.order_by(AuctionItem.bid_count.desc())
+        keys = [(AuctionItem.bid_count, True), (AuctionItem.id, True)]
     else:  # newest
-        query = query.order_by(AuctionItem.created_at.desc())
+        keys = [(AuctionItem.created_at, True), (AuctionItem.id, True)]
 
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    items = [item.to_card_dict() for item in pagination.items]
-
-    # Attach is_liked for logged-in users
-    if not liked_only:
-        current_user_id = _get_current_user_id()
-    _attach_is_liked(items, current_user_id)
+    if params["cursor"] is not None:
+        page_items, next_cursor = keyset_paginate(
+            query, keys, params["cursor"], params["per_page"]
+        )
+        data = {"items": AuctionItem.to_card_dicts(page_items), "next_cursor": next_cursor}
+        if params["with_total"]:
+            data["total"] = query.order_by(None).count()
+        return data
 
-    return jsonify(
-        {
-            "items": items,
-            "total": pagination.total,
-            "page": pagination.page,
-            "pages": pagination.pages,
-        }
+    pagination = query.order_by(*order_by_keys(keys)).paginate(
+        page=params["page"], per_page=params["per_page"], error_out=False
     )
+    return {
+        "items": AuctionItem.to_card_dicts(pagination.items),
+        "total": pagination.total,
+        "page": pagination.page,
+        "pages": pagination.pages,
+    }
 
 
 @items_bp.route("/<int:item_id>", methods=["GET"])
 def get_item(item_id):
+    current_user_id = _get_current_user_id()
+    record_view = request.args.get("record_view", "").lower() == "true"
+
+    # Conditional GET for polls; reserve price and is_liked depend on the viewer
+    etag = None
+    if not record_view:
+        etag = item_etag(item_id, current_user_id, views=True)
+        if etag is None:
+            return jsonify({"errors": ["拍品不存在"]}), 404
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
     item = db.session.get(AuctionItem, item_id)
     if not item:
         return jsonify({"errors": ["拍品不存在"]}), 404
 
-    # Only increment view count when explicitly requested (first page load)
-    if request.args.get("record_view", "").lower() == "true":
-        item.view_count = (item.view_count or 0) + 1
-        db.session.commit()
+    # Only count a view when explicitly requested (first page load); the
+    # increment is buffered and written back in batches
+    if record_view:
+        view_counter.record(item.id)
 
     # Check if the requester is the seller (to show reserve price)
     include_reserve = False
     is_liked = False
-    current_user_id = _get_current_user_id()
     if current_user_id:
         if current_user_id == item.seller_id:
             include_reserve = True
@@ -156,15 +229,51 @@ def get_item(item_id):
     data = item.to_dict(include_reserve=include_reserve)
     data["is_liked"] = is_liked
 
-    # Attach liked users list
-    liked_users = [
-        like.user.to_public_dict()
-        for like in ItemLike.query.filter_by(item_id=item.id).all()
-        if like.user
-    ]
-    data["liked_users"] = liked_users
+    # Attach the most recent likers; the rest are paged via /likes
+    liked = liked_users_cache.get(item.id)
+    if liked is None:
+        generation = liked_users_cache.generation
+        user_ids, next_cursor = _liked_user_ids_page(item.id, None, LIKED_USERS_LIMIT)
+        liked = {"user_ids": user_ids, "next_cursor": next_cursor}
+        liked_users_cache.set(item.id, liked, generation)
+    data["liked_users"] = _public_users(liked["user_ids"])
+    data["liked_users_cursor"] = liked["next_cursor"]
 
-    return jsonify({"item": data})
+    response = jsonify({"item": data})
+    return with_etag(response, etag) if etag else response
+
+
+@items_bp.route("/<int:item_id>/likes", methods=["GET"])
+def list_likes(item_id):
+    """Users who liked the item, newest first, cursor-paginated."""
+    if db.session.get(AuctionItem, item_id) is None:
+        return jsonify({"errors": ["拍品不存在"]}), 404
+
+    per_page = request.args.get("per_page", LIKED_USERS_LIMIT, type=int)
+    per_page = max(1, min(per_page, MAX_LIKED_USERS_PAGE))
+    try:
+        user_ids, next_cursor = _liked_user_ids_page(item_id, request.args.get("cursor"), per_page)
+    except InvalidCursor:
+        return jsonify({"errors": ["无效的分页游标"]}), 400
+    return jsonify({"users": _public_users(user_ids), "next_cursor": next_cursor})
+
+
+@items_bp.route("/<int:item_id>/stream", methods=["GET"])
+def stream_item(item_id):
+    """SSE stream of bid / end-time / status / comment changes for one item."""
+    # Subscribe before taking the snapshot so no change falls in between
+    subscription = item_events.subscribe(item_id)
+    item = db.session.get(AuctionItem, item_id)
+    if not item:
+        item_events.unsubscribe(item_id, subscription)
+        return jsonify({"errors": ["拍品不存在"]}), 404
+    snapshot = {"item": item.to_live_dict()}
+
+    return Response(
+        item_events.stream(item_id, subscription, snapshot),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @items_bp.route("/<int:item_id>", methods=["PUT"])
@@ -182,7 +291,7 @@ def update_item(item_id):
 
     if item.status == AuctionItem.STATUS_DRAFT:
         # Can edit everything in draft
-        errors = _validate_item_data(data, is_update=True)
+        errors = validate_item_data(data, is_update=True)
         if errors:
             return jsonify({"errors": errors}), 400
 
@@ -207,10 +316,19 @@ def update_item(item_id):
         # Update images
         if "image_urls" in data:
             # Remove old images
+            old_urls = [
+                url for (url,) in
+                db.session.query(ItemImage.image_url).filter_by(item_id=item.id)
+            ]
             ItemImage.query.filter_by(item_id=item.id).delete()
+            release_files(old_urls)
             for idx, url in enumerate(data["image_urls"][:5]):
                 img = ItemImage(item_id=item.id, image_url=url, sort_order=idx)
                 db.session.add(img)
+            retain_files(data["image_urls"][:5])
+            # Image rows aren't part of the item row; bump updated_at so
+            # cached snapshots and ETags move on
+            item.updated_at = datetime.now(timezone.utc)
 
     elif item.status == AuctionItem.STATUS_ACTIVE:
         # Can only edit description when active
@@ -222,6 +340,8 @@ def update_item(item_id):
         return jsonify({"errors": ["当前状态不允许编辑"]}), 400
 
     db.session.commit()
+    if item.status == AuctionItem.STATUS_ACTIVE:
+        listing_cache.invalidate()
     return jsonify({"item": item.to_dict(include_reserve=True)})
 
 
@@ -257,16 +377,20 @@ def publish_item(item_id):
         duration = timedelta(days=duration_days)
 
     now = datetime.now(timezone.utc)
-    item.start_time = now
-    item.end_time = now + duration
-    item.status = AuctionItem.STATUS_ACTIVE
     # Reset for re-listing
     if item.bid_count > 0 and item.status == AuctionItem.STATUS_ENDED_UNSOLD:
         item.current_price = item.starting_price
         item.bid_count = 0
         item.winner_id = None
+        item.leading_bid_id = None
+        item.leading_bidder_id = None
+    item.start_time = now
+    item.end_time = now + duration
+    item.status = AuctionItem.STATUS_ACTIVE
 
     db.session.commit()
+    expiry_queue.schedule(item.id, now + duration)
+    listing_cache.invalidate()
     return jsonify({"item": item.to_dict(include_reserve=True)})
 
 
@@ -281,19 +405,45 @@ def toggle_like(item_id):
 
     existing = ItemLike.query.filter_by(item_id=item.id, user_id=user_id).first()
     if existing:
-        # Unlike
-        db.session.delete(existing)
-        item.like_count = max((item.like_count or 0) - 1, 0)
+        # Unlike; only the request that actually removed the row decrements
+        removed = db.session.execute(
+            db.delete(ItemLike).where(ItemLike.id == existing.id)
+        ).rowcount
+        delta = -1 if removed else 0
         is_liked = False
     else:
-        # Like
-        like = ItemLike(item_id=item.id, user_id=user_id)
-        db.session.add(like)
-        item.like_count = (item.like_count or 0) + 1
+        # Like; a concurrent like of the same user hits the unique constraint
+        try:
+            db.session.add(ItemLike(item_id=item.id, user_id=user_id))
+            db.session.flush()
+            delta = 1
+        except IntegrityError:
+            db.session.rollback()
+            delta = 0
         is_liked = True
 
+    if delta:
+        # Atomic in SQL so concurrent toggles never overwrite each other
+        like_count = db.session.execute(
+            db.update(AuctionItem)
+            .where(AuctionItem.id == item.id)
+            .values(like_count=db.case(
+                (db.func.coalesce(AuctionItem.like_count, 0) + delta < 0, 0),
+                else_=db.func.coalesce(AuctionItem.like_count, 0) + delta,
+            ))
+            .returning(AuctionItem.like_count)
+            .execution_options(synchronize_session=False)
+        ).scalar_one()
+    else:
+        like_count = db.session.scalar(
+            db.select(AuctionItem.like_count).where(AuctionItem.id == item.id)
+        )
+
     db.session.commit()
-    return jsonify({"is_liked": is_liked, "like_count": item.like_count})
+    if delta:
+        liked_users_cache.discard(item.id)
+        listing_cache.invalidate()
+    return jsonify({"is_liked": is_liked, "like_count": like_count or 0})
 
 
 @items_bp.route("/<int:item_id>/cancel", methods=["POST"])
@@ -313,6 +463,9 @@ def cancel_item(item_id):
 
     item.status = AuctionItem.STATUS_CANCELLED
     db.session.commit()
+    expiry_queue.discard(item.id)
+    listing_cache.invalidate()
+    item_events.publish(item.id, "status", {"item": item.to_live_dict()})
     return jsonify({"item": item.to_dict(include_reserve=True)})
 
 
@@ -329,6 +482,7 @@ def delete_item(item_id):
     if item.status != AuctionItem.STATUS_DRAFT:
         return jsonify({"errors": ["只有草稿状态的拍品可以删除"]}), 400
 
+    release_files(img.image_url for img in item.images)
     db.session.delete(item)
     db.session.commit()
     return jsonify({"message": "删除成功"})
@@ -345,7 +499,7 @@ def my_items():
         query = query.filter(AuctionItem.status == status)
 
     query = query.order_by(AuctionItem.created_at.desc())
-    items = [item.to_card_dict() for item in query.all()]
+    items = AuctionItem.to_card_dicts(query.all())
     _attach_is_liked(items, user_id)
     return jsonify({"items": items})
 
@@ -355,55 +509,88 @@ def my_items():
 def my_bids():
     """Items the user has bid on."""
     user_id = int(get_jwt_identity())
+    page = request.args.get("page", 1, type=int)
+    per_page = max(1, min(request.args.get("per_page", 20, type=int), 50))
+    status = request.args.get("status")
 
     from app.models import Bid
 
-    # Get distinct item IDs the user has bid on
-    bid_item_ids = (
-        db.session.query(Bid.item_id)
+    # One grouped pass over the user's bids gives every item and their max bid
+    my_max = (
+        db.session.query(Bid.item_id, db.func.max(Bid.amount).label("my_max_bid"))
         .filter(Bid.bidder_id == user_id)
-        .distinct()
-        .all()
+        .group_by(Bid.item_id)
+        .subquery()
+    )
+    query = db.session.query(AuctionItem, my_max.c.my_max_bid).join(
+        my_max, my_max.c.item_id == AuctionItem.id
     )
-    item_ids = [row[0] for row in bid_item_ids]
-
-    if not item_ids:
-        return jsonify({"items": []})
-
-    items = AuctionItem.query.filter(AuctionItem.id.in_(item_ids)).order_by(
-        AuctionItem.end_time.desc()
-    ).all()
-
-    result = []
-    for item in items:
-        card = item.to_card_dict()
-        # Get user's highest bid on this item
-        user_max_bid = (
-            db.session.query(db.func.max(Bid.amount))
-            .filter(Bid.item_id == item.id, Bid.bidder_id == user_id)
-            .scalar()
+
+    if status == "active":
+        query = query.filter(AuctionItem.status == AuctionItem.STATUS_ACTIVE)
+    elif status == "won":
+        query = query.filter(AuctionItem.winner_id == user_id)
+    elif status == "lost":
+        query = query.filter(
+            AuctionItem.status.in_(
+                [AuctionItem.STATUS_ENDED_WON, AuctionItem.STATUS_ENDED_UNSOLD, AuctionItem.STATUS_COMPLETED]
+            ),
+            AuctionItem.winner_id.is_distinct_from(user_id),
         )
+
+    pagination = query.order_by(AuctionItem.end_time.desc(), AuctionItem.id.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+    rows = pagination.items
+    cards = AuctionItem.to_card_dicts([item for item, _ in rows])
+
+    for (item, user_max_bid), card in zip(rows, cards):
         card["my_max_bid"] = user_max_bid
-        card["is_leading"] = (
-            item.status == AuctionItem.STATUS_ACTIVE
-            and user_max_bid == item.current_price
-        )
+        if item.leading_bidder_id is not None:
+            is_leading = item.leading_bidder_id == user_id
+        else:
+            is_leading = user_max_bid == item.current_price
+        card["is_leading"] = item.status == AuctionItem.STATUS_ACTIVE and is_leading
         card["is_winner"] = item.winner_id == user_id
-        result.append(card)
 
-    _attach_is_liked(result, user_id)
-    return jsonify({"items": result})
+    _attach_is_liked(cards, user_id)
+    return jsonify(
+        {
+            "items": cards,
+            "total": pagination.total,
+            "page": pagination.page,
+            "pages": pagination.pages,
+        }
+    )
+
+
+def _liked_user_ids_page(item_id, cursor, per_page):
+    """Ids of a page of likers, newest first."""
+    query = db.session.query(ItemLike.user_id).filter(ItemLike.item_id == item_id)
+    return keyset_paginate(query, [(ItemLike.id, True)], cursor, per_page)
+
+
+def _public_users(user_ids):
+    """Public profiles in the order of ``user_ids``, from the profile cache."""
+    users = load_public_users(user_ids)
+    return [users[user_id] for user_id in user_ids if user_id in users]
 
 
 def _get_current_user_id():
-    """Try to get the current user id from an optional JWT. Returns int or None."""
+    """Try to get the current user id from an optional JWT. Returns int or None.
+
+    The token is verified once per request; later calls reuse the result.
+    """
+    if "optional_user_id" in g:
+        return g.optional_user_id
     from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity as get_id
     try:
         verify_jwt_in_request(optional=True)
         uid = get_id()
-        return int(uid) if uid else None
+        g.optional_user_id = int(uid) if uid else None
     except Exception:
-        return None
+        g.optional_user_id = None
+    return g.optional_user_id
 
 
 def _attach_is_liked(cards, user_id):
@@ -423,7 +610,7 @@ def _attach_is_liked(cards, user_id):
     return cards
 
 
-def _validate_item_data(data, is_update=False):
+def validate_item_data(data, is_update=False):
     errors = []
     if not is_update or "title" in data:
         title = data.get("title", "").strip()
@@ -3,6 +3,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app import db
 from app.models import Notification
+from app.outbox import notification_worker
+from app.pagination import InvalidCursor, keyset_paginate, order_by_keys
+from app.routes.auth import admin_required
 
 notifications_bp = Blueprint("notifications", __name__)
 
@@ -13,11 +16,29 @@ def list_notifications():
     user_id = int(get_jwt_identity())
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 20, type=int)
+    per_page = max(1, min(per_page, 100))
 
-    query = Notification.query.filter_by(user_id=user_id).order_by(
-        Notification.created_at.desc()
+    query = Notification.query.filter_by(user_id=user_id)
+    keys = [(Notification.created_at, True), (Notification.id, True)]
+
+    # Cursor mode (opt-in with ?cursor=, empty for the first page)
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        try:
+            notifications, next_cursor = keyset_paginate(query, keys, cursor, per_page)
+        except InvalidCursor:
+            return jsonify({"errors": ["无效的分页游标"]}), 400
+        data = {
+            "notifications": [n.to_dict() for n in notifications],
+            "next_cursor": next_cursor,
+        }
+        if request.args.get("with_total", "").lower() == "true":
+            data["total"] = query.count()
+        return jsonify(data)
+
+    pagination = query.order_by(*order_by_keys(keys)).paginate(
+        page=page, per_page=per_page, error_out=False
     )
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
 
     return jsonify(
         {
@@ -29,6 +50,12 @@ def list_notifications():
     )
 
 
+@notifications_bp.route("/outbox-stats", methods=["GET"])
+@admin_required
+def outbox_stats():
+    return jsonify(notification_worker.stats())
+
+
 @notifications_bp.route("/unread-count", methods=["GET"])
 @jwt_required()
 def unread_count():
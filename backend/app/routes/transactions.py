@@ -4,7 +4,9 @@ from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from app import db
-from app.models import AuctionItem, Transaction, Notification
+from app.cache import listing_cache
+from app.models import AuctionItem, Transaction
+from app.outbox import KIND_TRANSACTION_CONFIRMED, enqueue
 
 transactions_bp = Blueprint("transactions", __name__)
 
@@ -62,12 +64,11 @@ def confirm_transaction(transaction_id):
         other_user_id = txn.seller_id
 
     # Notify the other party
-    _notify(
-        other_user_id,
-        Notification.TYPE_TRANSACTION_CONFIRMED,
-        "交易确认",
-        f"对方已确认「{txn.item.title}」的交易完成",
-        txn.item_id,
+    enqueue(
+        KIND_TRANSACTION_CONFIRMED,
+        user_id=other_user_id,
+        item_id=txn.item_id,
+        title=txn.item.title,
     )
 
     # Check if both confirmed -> complete
@@ -78,6 +79,8 @@ def confirm_transaction(transaction_id):
             item.status = AuctionItem.STATUS_COMPLETED
 
     db.session.commit()
+    if txn.completed_at:
+        listing_cache.invalidate()
     return jsonify({"transaction": txn.to_dict()})
 
 
@@ -91,13 +94,3 @@ def my_transactions():
 
     return jsonify({"transactions": [t.to_dict() for t in txns]})
 
-
-def _notify(user_id, ntype, title, content, item_id=None):
-    n = Notification(
-        user_id=user_id,
-        type=ntype,
-        title=title,
-        content=content,
-        related_item_id=item_id,
-    )
-    db.session.add(n)
@@ -1,10 +1,11 @@
-import os
-import uuid
-
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required
 from werkzeug.utils import secure_filename
 
+from app.images import variant_worker
+from app.static_files import send_upload
+from app.storage import store_upload
+
 upload_bp = Blueprint("upload", __name__)
 
 
@@ -29,11 +30,12 @@ def upload_file():
     if not allowed_file(file.filename):
         return jsonify({"errors": ["不支持的文件格式，请上传 png/jpg/jpeg/gif/webp"]}), 400
 
-    # Generate unique filename
+    # Stored under its content hash: identical uploads share one file and
+    # the URL can be cached forever
     ext = file.filename.rsplit(".", 1)[1].lower()
-    filename = f"{uuid.uuid4().hex}.{ext}"
-    filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
-    file.save(filepath)
+    filename = store_upload(file.stream, ext, current_app.config["UPLOAD_FOLDER"])
+    # Thumbnail / detail-size WebP variants are generated in the background
+    variant_worker.submit(current_app._get_current_object(), filename)
 
     # Return the URL path
     url = f"/api/upload/files/{filename}"
@@ -42,5 +44,4 @@ def upload_file():
 
 @upload_bp.route("/files/<filename>", methods=["GET"])
 def get_file(filename):
-    filename = secure_filename(filename)
-    return send_from_directory(current_app.config["UPLOAD_FOLDER"], filename)
+    return send_upload(secure_filename(filename))
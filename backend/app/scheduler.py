@@ -1,131 +1,340 @@
-from datetime import datetime, timezone
+import heapq
+import os
+import threading
+import time
+from datetime import datetime, timezone, timedelta
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
+from app.bus import process_bus
+from app.leader import LeaderLock
+from app.models import ensure_utc
 
-def check_expired_auctions(app):
-    """Check for auctions that have expired and finalize them."""
+# 兜底全表扫描的间隔；正常情况下拍卖由到期队列准时结束
+RECONCILE_MINUTES = 10
+# 结束拍卖失败（如数据库繁忙）后的重试延迟
+RETRY_SECONDS = 5
+# 每个事务最多结束的拍卖数，控制写锁持有时间
+FINALIZE_CHUNK = 200
+# 回收无人引用的上传文件的间隔
+UPLOAD_GC_MINUTES = 60
+# 非 leader 进程尝试接管调度的间隔
+LEADER_RETRY_SECONDS = 5
+
+
+def check_expired_auctions(app, item_ids=None):
+    """Check for auctions that have expired and finalize them.
+
+    ``item_ids`` limits the check to the given items; without it every
+    active auction is scanned (the reconciliation sweep). Items are
+    finalized in chunks of ``FINALIZE_CHUNK``, one short transaction each,
+    so the SQLite write lock is never held for the whole batch.
+    """
     with app.app_context():
         from app import db
-        from app.models import AuctionItem, Bid, Notification, Transaction
+        from app.models import AuctionItem
 
         now = datetime.now(timezone.utc)
-        expired_items = AuctionItem.query.filter(
+        query = db.session.query(AuctionItem.id).filter(
             AuctionItem.status == AuctionItem.STATUS_ACTIVE,
             AuctionItem.end_time <= now,
-        ).all()
-
-        for item in expired_items:
-            if item.bid_count == 0:
-                # No bids - unsold
-                item.status = AuctionItem.STATUS_ENDED_UNSOLD
-                _notify(
-                    db,
-                    item.seller_id,
-                    Notification.TYPE_AUCTION_UNSOLD,
-                    "拍品流拍",
-                    f"「{item.title}」已结束，无人出价",
-                    item.id,
-                )
-            else:
-                # Has bids - check reserve price
-                highest_bid = (
-                    Bid.query.filter_by(item_id=item.id)
-                    .order_by(Bid.amount.desc())
-                    .first()
-                )
+        )
+        if item_ids is not None:
+            query = query.filter(AuctionItem.id.in_(item_ids))
+        expired_ids = [row[0] for row in query.order_by(AuctionItem.end_time).all()]
+        db.session.rollback()  # Release the read snapshot before writing
+
+        for i in range(0, len(expired_ids), FINALIZE_CHUNK):
+            _finalize_chunk(expired_ids[i:i + FINALIZE_CHUNK], now)
 
-                reserve_met = (
-                    item.reserve_price is None
-                    or highest_bid.amount >= item.reserve_price
-                )
 
-                if reserve_met:
-                    # Auction won
-                    item.status = AuctionItem.STATUS_ENDED_WON
-                    item.winner_id = highest_bid.bidder_id
-
-                    # Create transaction
-                    txn = Transaction(
-                        item_id=item.id,
-                        seller_id=item.seller_id,
-                        buyer_id=highest_bid.bidder_id,
-                        final_price=highest_bid.amount,
-                    )
-                    db.session.add(txn)
-
-                    # Notify winner
-                    _notify(
-                        db,
-                        highest_bid.bidder_id,
-                        Notification.TYPE_AUCTION_WON,
-                        "竞拍成功",
-                        f"恭喜！您以 {highest_bid.amount:.2f} 元拍下「{item.title}」",
-                        item.id,
-                    )
-                    # Notify seller
-                    _notify(
-                        db,
-                        item.seller_id,
-                        Notification.TYPE_AUCTION_SOLD,
-                        "拍品已成交",
-                        f"恭喜！「{item.title}」已成交，成交价 {highest_bid.amount:.2f} 元",
-                        item.id,
-                    )
-                else:
-                    # Reserve not met - unsold
-                    item.status = AuctionItem.STATUS_ENDED_UNSOLD
-
-                    # Notify seller
-                    _notify(
-                        db,
-                        item.seller_id,
-                        Notification.TYPE_RESERVE_NOT_MET,
-                        "拍品流拍",
-                        f"「{item.title}」已结束，最高出价 {highest_bid.amount:.2f} 元未达到保留价",
-                        item.id,
-                    )
-
-                    # Notify all bidders
-                    bidder_ids = (
-                        db.session.query(Bid.bidder_id)
-                        .filter(Bid.item_id == item.id)
-                        .distinct()
-                        .all()
-                    )
-                    for (bidder_id,) in bidder_ids:
-                        _notify(
-                            db,
-                            bidder_id,
-                            Notification.TYPE_RESERVE_NOT_MET,
-                            "拍品流拍",
-                            f"「{item.title}」已结束，最高出价未达到卖家设定的保留价",
-                            item.id,
-                        )
-
-        db.session.commit()
-
-
-def _notify(db, user_id, ntype, title, content, item_id=None):
-    from app.models import Notification
-
-    n = Notification(
-        user_id=user_id,
-        type=ntype,
-        title=title,
-        content=content,
-        related_item_id=item_id,
+def _finalize_chunk(item_ids, now):
+    from app import db
+    from app.cache import listing_cache
+    from app.events import item_events
+    from app.models import AuctionItem, Bid, Transaction
+    from app.outbox import KIND_AUCTION_ENDED, enqueue_many
+
+    won = db.and_(
+        AuctionItem.bid_count > 0,
+        db.or_(
+            AuctionItem.reserve_price.is_(None),
+            AuctionItem.current_price >= AuctionItem.reserve_price,
+        ),
+    )
+    # current_price and leading_bidder_id are maintained by place_bid; the
+    # bids table is only consulted for rows predating leader tracking
+    highest_bidder = db.func.coalesce(
+        AuctionItem.leading_bidder_id,
+        db.select(Bid.bidder_id)
+        .where(Bid.item_id == AuctionItem.id)
+        .order_by(Bid.amount.desc(), Bid.id)
+        .limit(1)
+        .scalar_subquery(),
     )
-    db.session.add(n)
+
+    # Re-checking status/end_time in the UPDATE itself means an item whose
+    # end was just extended by a bid is left alone
+    finalized = db.session.execute(
+        db.update(AuctionItem)
+        .where(
+            AuctionItem.id.in_(item_ids),
+            AuctionItem.status == AuctionItem.STATUS_ACTIVE,
+            AuctionItem.end_time <= now,
+        )
+        .values(
+            status=db.case(
+                (won, AuctionItem.STATUS_ENDED_WON),
+                else_=AuctionItem.STATUS_ENDED_UNSOLD,
+            ),
+            winner_id=db.case((won, highest_bidder), else_=None),
+            updated_at=now,
+        )
+        .returning(
+            AuctionItem.id,
+            AuctionItem.seller_id,
+            AuctionItem.title,
+            AuctionItem.status,
+            AuctionItem.winner_id,
+            AuctionItem.current_price,
+            AuctionItem.bid_count,
+            AuctionItem.end_time,
+            AuctionItem.reserve_price,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not finalized:
+        db.session.rollback()
+        return
+
+    transactions = [
+        {
+            "item_id": row.id,
+            "seller_id": row.seller_id,
+            "buyer_id": row.winner_id,
+            "final_price": row.current_price,
+            "created_at": now,
+        }
+        for row in finalized
+        if row.status == AuctionItem.STATUS_ENDED_WON
+    ]
+    # Winner, seller and (reserve not met) every bidder are notified by the
+    # outbox worker, off this transaction
+    outbox_events = [
+        {
+            "item_id": row.id,
+            "title": row.title,
+            "seller_id": row.seller_id,
+            "status": row.status,
+            "winner_id": row.winner_id,
+            "price": row.current_price,
+            "bid_count": row.bid_count,
+        }
+        for row in finalized
+    ]
+
+    if transactions:
+        db.session.execute(db.insert(Transaction), transactions)
+    enqueue_many(KIND_AUCTION_ENDED, outbox_events, now)
+    db.session.commit()
+    listing_cache.invalidate()
+
+    for row in finalized:
+        item_events.publish(row.id, "status", {"item": {
+            "id": row.id,
+            "current_price": row.current_price,
+            "bid_count": row.bid_count,
+            "end_time": ensure_utc(row.end_time).isoformat(),
+            "status": row.status,
+            "winner_id": row.winner_id,
+            "reserve_met": row.reserve_price is None or row.current_price >= row.reserve_price,
+        }})
+
+
+class ExpiryQueue:
+    """Min-heap of auction deadlines driving on-time finalization.
+
+    ``schedule`` is called whenever an end time is set or extended; stale
+    heap entries are skipped lazily by comparing with the latest deadline
+    recorded for the item. A worker thread sleeps until the earliest
+    deadline and finalizes everything due at that moment.
+
+    Only the scheduler leader runs the queue. Other workers relay their
+    ``schedule`` / ``discard`` calls to it over the process bus; a leader
+    taking over reloads every deadline from the database and replays the
+    calls that arrived while it was loading.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap = []  # (end_time, item_id)
+        self._deadlines = {}  # item_id -> latest end_time
+        self._thread = None
+        self._pending = None  # calls relayed while the leader loads
+
+    def schedule(self, item_id, end_time):
+        end_time = ensure_utc(end_time)
+        self._relayed(item_id, end_time)
+        process_bus.broadcast("expiry", [item_id, end_time.isoformat()])
+
+    def discard(self, item_id):
+        self._relayed(item_id, None)
+        process_bus.broadcast("expiry", [item_id, None])
+
+    def schedule_local(self, deadlines):
+        """Schedule ``(item_id, end_time)`` pairs in this process without relaying.
+
+        For deadlines delivered to the leader by other means than the bus,
+        such as bulk imports through the outbox.
+        """
+        for item_id, end_time in deadlines:
+            self._relayed(item_id, ensure_utc(end_time))
+
+    def _relayed(self, item_id, end_time):
+        with self._cond:
+            if self._thread is None:
+                # Followers keep no state; a leader still loading keeps the
+                # call, since its snapshot may predate it
+                if self._pending is not None:
+                    self._pending.append((item_id, end_time))
+                return
+            self._apply(item_id, end_time)
+
+    def _apply(self, item_id, end_time):
+        if end_time is None:
+            with self._cond:
+                self._deadlines.pop(item_id, None)
+        else:
+            self._push(item_id, end_time)
+
+    def _push(self, item_id, end_time):
+        with self._cond:
+            self._deadlines[item_id] = end_time
+            heapq.heappush(self._heap, (end_time, item_id))
+            if self._heap[0] == (end_time, item_id):
+                self._cond.notify()
+
+    def load(self, app):
+        """Seed the queue with every active auction in the database."""
+        with app.app_context():
+            from app import db
+            from app.models import AuctionItem
+
+            rows = (
+                db.session.query(AuctionItem.id, AuctionItem.end_time)
+                .filter(
+                    AuctionItem.status == AuctionItem.STATUS_ACTIVE,
+                    AuctionItem.end_time.isnot(None),
+                )
+                .all()
+            )
+        for item_id, end_time in rows:
+            self._push(item_id, ensure_utc(end_time))
+
+    def start(self, app):
+        if self._thread is not None:
+            return
+        with self._cond:
+            self._pending = []
+        try:
+            self.load(app)
+        except Exception:
+            with self._cond:
+                self._pending = None
+            raise
+        with self._cond:
+            # Replay in arrival order so the latest call for an item wins
+            for item_id, end_time in self._pending:
+                self._apply(item_id, end_time)
+            self._pending = None
+            self._thread = threading.Thread(
+                target=self._run, args=(app,), name="auction-expiry", daemon=True
+            )
+        self._thread.start()
+
+    def _pop_due(self):
+        """Block until at least one deadline has passed and return those items."""
+        with self._cond:
+            while True:
+                now = datetime.now(timezone.utc)
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    end_time, item_id = heapq.heappop(self._heap)
+                    if self._deadlines.get(item_id) == end_time:
+                        del self._deadlines[item_id]
+                        due.append(item_id)
+                if due:
+                    return due
+                timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+                self._cond.wait(timeout)
+
+    def _run(self, app):
+        while True:
+            item_ids = self._pop_due()
+            try:
+                check_expired_auctions(app, item_ids)
+            except Exception:
+                app.logger.exception("Failed to finalize auctions %s", item_ids)
+                retry_at = datetime.now(timezone.utc) + timedelta(seconds=RETRY_SECONDS)
+                for item_id in item_ids:
+                    self._push(item_id, retry_at)
+
+
+expiry_queue = ExpiryQueue()
+process_bus.register(
+    "expiry",
+    lambda payload: expiry_queue._relayed(
+        payload[0], datetime.fromisoformat(payload[1]) if payload[1] else None
+    ),
+)
+
+
+def collect_upload_garbage(app):
+    """Remove one batch of uploaded files nothing references any more."""
+    with app.app_context():
+        from app.storage import collect_garbage
+
+        removed = collect_garbage(app.config["UPLOAD_FOLDER"])
+        if removed:
+            app.logger.info("Removed %d unreferenced upload(s)", removed)
 
 
 def start_scheduler(app):
+    """Run the auction jobs in whichever process holds the leader lock.
+
+    Every worker calls this; the losers keep retrying in the background so
+    one of them takes over if the leader exits.
+    """
+    lock = LeaderLock(app.config["SCHEDULER_LOCK_FILE"])
+
+    def elect():
+        while not lock.acquire():
+            time.sleep(LEADER_RETRY_SECONDS)
+        app.logger.info("Process %d is now the scheduler leader", os.getpid())
+        _run_jobs(app)
+
+    threading.Thread(target=elect, name="scheduler-election", daemon=True).start()
+
+
+def _run_jobs(app):
+    from app.outbox import notification_worker
+
+    expiry_queue.start(app)
+    notification_worker.start(app)
+
     scheduler = BackgroundScheduler()
     scheduler.add_job(
         check_expired_auctions,
         "interval",
-        seconds=30,
+        minutes=RECONCILE_MINUTES,
         args=[app],
         id="check_expired_auctions",
     )
+    scheduler.add_job(
+        collect_upload_garbage,
+        "interval",
+        minutes=UPLOAD_GC_MINUTES,
+        args=[app],
+        id="collect_upload_garbage",
+    )
     scheduler.start()
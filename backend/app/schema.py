@@ -0,0 +1,30 @@
+"""轻量级表结构升级：create_all 不会修改已存在的表，这里补齐新增的列和索引。"""
+from app import db
+
+
+def upgrade_schema():
+    """Add columns and indexes that exist on the models but not in the database.
+
+    Only additive changes are handled; new columns must be nullable or carry
+    a server default so existing rows stay valid.
+    """
+    engine = db.engine
+    inspector = db.inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                conn.execute(db.text(ddl))
+                added.append(f"{table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    return added
@@ -0,0 +1,82 @@
+"""拍品全文检索：SQLite FTS5 + trigram 分词，中文子串检索也能走索引。"""
+from sqlalchemy.exc import OperationalError
+
+from app import db
+
+FTS_TABLE = "auction_items_fts"
+# trigram 分词下少于 3 个字符的关键词无法走索引，回退到 LIKE
+MIN_MATCH_LENGTH = 3
+
+_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='auction_items', content_rowid='id',
+        tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON auction_items BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON auction_items BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON auction_items BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+
+def init_search_index(app):
+    """Create the FTS table and its sync triggers if the database supports them.
+
+    Triggers keep the index in step with every insert, edit and delete of
+    an item. A freshly created index is filled from the existing rows.
+    """
+    enabled = False
+    if db.engine.dialect.name == "sqlite":
+        try:
+            with db.engine.begin() as conn:
+                created = not db.inspect(conn).has_table(FTS_TABLE)
+                for ddl in _DDL:
+                    conn.execute(db.text(ddl))
+                if created:
+                    _rebuild(conn)
+            enabled = True
+        except OperationalError:
+            app.logger.warning("SQLite FTS5 trigram tokenizer unavailable; search uses LIKE")
+    app.extensions["search_index"] = enabled
+
+
+def rebuild_search_index():
+    with db.engine.begin() as conn:
+        _rebuild(conn)
+
+
+def _rebuild(conn):
+    conn.execute(db.text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def search_matches(app, term):
+    """CTE of (item_id, rank) matching ``term``, or None to fall back to LIKE.
+
+    The CTE is materialized: joined as a plain subquery SQLite re-runs the
+    MATCH once per candidate row, which is slower than the LIKE scan.
+    """
+    if not app.extensions.get("search_index") or len(term) < MIN_MATCH_LENGTH:
+        return None
+    # Quote as a single phrase: same substring semantics as the LIKE path
+    phrase = '"' + term.replace('"', '""') + '"'
+    return (
+        db.select(
+            db.literal_column("rowid").label("item_id"),
+            db.literal_column("rank").label("rank"),
+        )
+        .select_from(db.table(FTS_TABLE))
+        .where(db.literal_column(FTS_TABLE).op("MATCH")(phrase))
+        .cte("search_matches")
+        .prefix_with("MATERIALIZED")
+    )
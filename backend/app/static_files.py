@@ -0,0 +1,177 @@
+"""静态文件服务：前端产物清单（启动时扫描）、预压缩版本选择、长缓存头，以及交给前置代理发送文件的模式。"""
+import gzip
+import mimetypes
+import os
+from urllib.parse import quote
+
+from flask import current_app, request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.utils import safe_join
+
+from app.images import original_stem
+
+try:
+    import brotli
+except ImportError:  # brotli 是可选依赖，缺失时只生成 gzip
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Accept-Encoding token -> precompressed suffix, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = {".html", ".js", ".mjs", ".css", ".svg", ".json", ".map", ".txt", ".xml", ".ico", ".wasm"}
+MIN_COMPRESS_SIZE = 1024
+
+
+class StaticManifest:
+    """Paths of the built SPA, scanned once so requests never touch the filesystem to route.
+
+    Each entry maps a URL path to the precompressed siblings found next to
+    it (``app.js.br``, ``app.js.gz``).
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.files = {}
+
+    def scan(self):
+        files = {}
+        if os.path.isdir(self.root):
+            for dirpath, _, names in os.walk(self.root):
+                present = set(names)
+                for name in names:
+                    if any(name.endswith(suffix) and name[:-len(suffix)] in present
+                           for _, suffix in ENCODINGS):
+                        continue
+                    rel = os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, "/")
+                    files[rel] = {
+                        token: rel + suffix
+                        for token, suffix in ENCODINGS
+                        if name + suffix in present
+                    }
+        self.files = files
+        return self
+
+    def get(self, path):
+        return self.files.get(path)
+
+    def __contains__(self, path):
+        return path in self.files
+
+
+def compress_static(root, force=False):
+    """Write ``.gz`` (and ``.br`` when brotli is installed) next to compressible assets.
+
+    Returns the number of files written. Run at build time; existing
+    variants newer than their source are kept unless ``force``.
+    """
+    written = 0
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE:
+                continue
+            if os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            for token, suffix in ENCODINGS:
+                if token == "br" and brotli is None:
+                    continue
+                target = path + suffix
+                if not force and os.path.exists(target) \
+                        and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                with open(path, "rb") as f:
+                    data = f.read()
+                if token == "br":
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                # Not worth serving if it barely shrinks
+                if len(compressed) >= len(data) * 0.9:
+                    continue
+                with open(target + ".tmp", "wb") as f:
+                    f.write(compressed)
+                os.replace(target + ".tmp", target)
+                written += 1
+    return written
+
+
+def init_static(app, root):
+    app.config["USE_X_SENDFILE"] = app.config["STATIC_SENDFILE"] == "x-sendfile"
+    app.extensions["static_manifest"] = StaticManifest(root).scan()
+
+
+def send_static(root, path, cache_control, encodings=None, accel_prefix=None):
+    """Send ``root/path``, choosing a precompressed variant the client accepts.
+
+    In ``x-accel`` mode only the ``X-Accel-Redirect`` header is returned
+    (``accel_prefix`` + path) and nginx sends the bytes; ``x-sendfile`` is
+    handled by Flask's ``USE_X_SENDFILE``.
+    """
+    encoding, target = None, path
+    for token, _ in ENCODINGS:
+        if encodings and token in encodings and request.accept_encodings[token]:
+            encoding, target = token, encodings[token]
+            break
+
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if current_app.config["STATIC_SENDFILE"] == "x-accel" and accel_prefix:
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = accel_prefix + quote(target)
+    else:
+        full_path = safe_join(root, target)
+        if full_path is None:
+            raise NotFound()
+        try:
+            response = send_file(full_path, mimetype=mimetype, conditional=True)
+        except FileNotFoundError:
+            # removed since the manifest was scanned
+            raise NotFound()
+
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if encodings:
+        response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def send_frontend(root, path):
+    """Serve a built SPA file, or index.html for client-side routes."""
+    manifest = current_app.extensions["static_manifest"]
+    if not path or path not in manifest:
+        path = "index.html"
+        if path not in manifest:
+            # no frontend build (dev checkout): keep the 404 send_from_directory gave
+            raise NotFound()
+    if path == "index.html":
+        cache_control = "no-cache"
+    elif path.startswith("assets/"):
+        # Vite puts a content hash in every file name under assets/
+        cache_control = IMMUTABLE
+    else:
+        cache_control = "public, max-age=3600"
+    return send_static(
+        root, path, cache_control,
+        encodings=manifest.get(path),
+        accel_prefix=current_app.config["X_ACCEL_STATIC_PREFIX"],
+    )
+
+
+def send_upload(filename):
+    """Serve an uploaded file; names are content hashes, so they never change."""
+    folder = current_app.config["UPLOAD_FOLDER"]
+    accel_prefix = current_app.config["X_ACCEL_UPLOADS_PREFIX"]
+    full_path = safe_join(folder, filename)
+    if full_path is None:
+        raise NotFound()
+    if os.path.isfile(full_path):
+        return send_static(folder, filename, IMMUTABLE, accel_prefix=accel_prefix)
+
+    # A variant that isn't generated yet (or predates the backfill): serve
+    # the original under the variant URL, but don't let it be cached
+    stem = original_stem(filename)
+    if stem is not None:
+        for ext in current_app.config["ALLOWED_EXTENSIONS"]:
+            if os.path.isfile(os.path.join(folder, f"{stem}.{ext}")):
+                return send_static(folder, f"{stem}.{ext}", "no-cache", accel_prefix=accel_prefix)
+    raise NotFound()
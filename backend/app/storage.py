@@ -0,0 +1,225 @@
+"""内容寻址的上传存储：边接收边哈希写盘，相同内容只存一份；按引用计数增量回收无人引用的文件。"""
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.images import UPLOAD_URL_PREFIX, VARIANTS, is_variant_filename, variant_filename
+from app.models import ItemImage, StoredFile, User
+
+CHUNK_SIZE = 64 * 1024
+# 新上传但尚未被拍品 / 头像引用的文件至少保留这么久
+GC_GRACE_HOURS = 24
+# 每次回收最多处理的文件数
+GC_BATCH = 100
+# 统一扩展名，避免同一内容因 .jpeg / .jpg 存两份
+_EXT_ALIASES = {"jpeg": "jpg"}
+
+
+def filename_from_url(url):
+    """Stored filename behind an upload URL, or None for anything else."""
+    for prefix in (UPLOAD_URL_PREFIX, "/uploads/"):
+        if url and url.startswith(prefix):
+            return url[len(prefix):]
+    return None
+
+
+def store_upload(stream, ext, folder):
+    """Stream ``stream`` to ``folder`` under its content hash and register it.
+
+    The bytes are hashed while they are copied in ``CHUNK_SIZE`` pieces, so
+    the upload is never held in memory. Returns the filename.
+    """
+    ext = _EXT_ALIASES.get(ext, ext)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        filename = f"{digest.hexdigest()[:32]}.{ext}"
+
+        # Register (or revive) the row before the file is put in place; see
+        # collect_garbage for why this order matters
+        now = datetime.now(timezone.utc)
+        try:
+            db.session.add(StoredFile(filename=filename, size=size, unreferenced_since=now))
+            db.session.commit()
+        except IntegrityError:
+            # Same bytes stored before: restart its grace period if unused
+            db.session.rollback()
+            db.session.execute(
+                db.update(StoredFile)
+                .where(StoredFile.filename == filename, StoredFile.ref_count <= 0)
+                .values(unreferenced_since=now)
+            )
+            db.session.commit()
+
+        # Identical bytes: replacing the existing file is harmless
+        os.replace(tmp_path, os.path.join(folder, filename))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filename
+
+
+def _adjust_refs(urls, sign):
+    counts = Counter(filter(None, (filename_from_url(url) for url in urls)))
+    if not counts:
+        return
+    table = StoredFile.__table__
+    new_count = table.c.ref_count + sign * db.bindparam("delta")
+    db.session.execute(
+        table.update()
+        .where(table.c.filename == db.bindparam("name"))
+        .values(
+            ref_count=new_count,
+            unreferenced_since=db.case(
+                (new_count <= 0, db.func.coalesce(table.c.unreferenced_since, db.bindparam("now"))),
+                else_=None,
+            ),
+        ),
+        [
+            {"name": name, "delta": delta, "now": datetime.now(timezone.utc)}
+            for name, delta in counts.items()
+        ],
+    )
+
+
+def retain_files(urls):
+    """Count new references to uploaded files, in the caller's transaction."""
+    _adjust_refs(urls, 1)
+
+
+def release_files(urls):
+    """Drop references to uploaded files, in the caller's transaction."""
+    _adjust_refs(urls, -1)
+
+
+def referenced_urls(urls):
+    """The subset of ``urls`` an ItemImage or avatar actually points at."""
+    urls = list(urls)
+    if not urls:
+        return set()
+    images = db.session.query(ItemImage.image_url).filter(ItemImage.image_url.in_(urls))
+    avatars = db.session.query(User.avatar_url).filter(User.avatar_url.in_(urls))
+    return {row[0] for row in images.union(avatars)}
+
+
+def collect_garbage(folder, batch=GC_BATCH, grace=timedelta(hours=GC_GRACE_HOURS)):
+    """Delete up to ``batch`` files that have been unreferenced for ``grace``.
+
+    Candidates are re-checked against ItemImage / avatars, and counts that
+    drifted are repaired instead. Each file is first moved aside, then its
+    row is deleted only if it is still unreferenced and past the grace
+    period; a concurrent upload of the same bytes refreshes the row first,
+    so the delete fails and the file is moved back (or has already been
+    rewritten by the upload). Returns the number of files removed.
+    """
+    cutoff = datetime.now(timezone.utc) - grace
+    candidates = (
+        StoredFile.query.filter(
+            StoredFile.ref_count <= 0,
+            StoredFile.unreferenced_since <= cutoff,
+        )
+        .order_by(StoredFile.unreferenced_since)
+        .limit(batch)
+        .all()
+    )
+    if not candidates:
+        return 0
+
+    by_url = {UPLOAD_URL_PREFIX + f.filename: f for f in candidates}
+    by_url.update({"/uploads/" + f.filename: f for f in candidates})
+    still_used = {by_url[url].filename for url in referenced_urls(by_url)}
+    if still_used:
+        recount_refs(still_used)
+    names = [f.filename for f in candidates if f.filename not in still_used]
+    db.session.commit()
+
+    removed = 0
+    for name in names:
+        path = os.path.join(folder, name)
+        trash = f"{path}.gc"
+        if os.path.exists(path):
+            os.replace(path, trash)
+        deleted = db.session.execute(
+            db.delete(StoredFile).where(
+                StoredFile.filename == name,
+                StoredFile.ref_count <= 0,
+                StoredFile.unreferenced_since <= cutoff,
+            )
+        ).rowcount
+        db.session.commit()
+        if not deleted:
+            if os.path.exists(trash):
+                os.replace(trash, path)
+            continue
+        if os.path.exists(trash):
+            os.remove(trash)
+        for variant in VARIANTS:
+            variant_path = os.path.join(folder, variant_filename(name, variant))
+            if os.path.exists(variant_path):
+                os.remove(variant_path)
+        removed += 1
+    return removed
+
+
+def recount_refs(filenames=None):
+    """Recompute ref_count from ItemImage and avatars (all files by default)."""
+    query = StoredFile.query
+    if filenames is not None:
+        query = query.filter(StoredFile.filename.in_(list(filenames)))
+    files = query.all()
+    counts = Counter()
+    urls = {}
+    for f in files:
+        urls[UPLOAD_URL_PREFIX + f.filename] = f.filename
+        urls["/uploads/" + f.filename] = f.filename
+    url_list = list(urls)
+    for start in range(0, len(url_list), 500):
+        chunk = url_list[start:start + 500]
+        for (url,) in db.session.query(ItemImage.image_url).filter(ItemImage.image_url.in_(chunk)):
+            counts[urls[url]] += 1
+        for (url,) in db.session.query(User.avatar_url).filter(User.avatar_url.in_(chunk)):
+            counts[urls[url]] += 1
+
+    now = datetime.now(timezone.utc)
+    changed = 0
+    for f in files:
+        count = counts[f.filename]
+        if f.ref_count != count:
+            f.ref_count = count
+            changed += 1
+        if count > 0:
+            f.unreferenced_since = None
+        elif f.unreferenced_since is None:
+            f.unreferenced_since = now
+    return changed
+
+
+def register_existing(folder, allowed_extensions):
+    """Add a StoredFile row for every original on disk that has none."""
+    known = {name for (name,) in db.session.query(StoredFile.filename)}
+    now = datetime.now(timezone.utc)
+    added = 0
+    for name in sorted(os.listdir(folder)):
+        if name in known or "." not in name or is_variant_filename(name):
+            continue
+        if name.rsplit(".", 1)[1].lower() not in allowed_extensions:
+            continue
+        size = os.path.getsize(os.path.join(folder, name))
+        db.session.add(StoredFile(filename=name, size=size, unreferenced_since=now))
+        added += 1
+    return added
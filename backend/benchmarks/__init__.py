@@ -0,0 +1,9 @@
+"""性能基准：按规模生成合成数据库，用 Flask 测试客户端压测热点接口和定时任务，输出可对比的 JSON 报告。
+
+    cd backend
+    python -m benchmarks --scale 10k                  # 全部场景
+    python -m benchmarks --scale 100k --only list_items get_item
+    python -m benchmarks --scale 10k --output run.json --compare baseline.json
+
+不变量回归检查（并发出价等）在临时小库上运行：python -m benchmarks.checks
+"""
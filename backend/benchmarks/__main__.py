@@ -0,0 +1,182 @@
+"""命令行入口：python -m benchmarks --help"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+# 生成的数据库缓存在这里，同一规模和种子只生成一次，每次运行复制一份使用
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Run the LeAuction benchmark suite against a synthetic database.",
+    )
+    parser.add_argument("--scale", default="10k", help="10k, 100k, 1m or a number of items")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="benchmark database to use (built if missing)")
+    parser.add_argument("--rebuild", action="store_true", help="regenerate the database")
+    parser.add_argument("--only", nargs="+", metavar="SCENARIO", help="scenarios to run")
+    parser.add_argument("--requests", type=int, default=200, help="timed calls per measurement")
+    parser.add_argument("--threads", type=int, default=8, help="threads of concurrent scenarios")
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE",
+        help="config override, e.g. READONLY_ENGINE=0 (repeatable)",
+    )
+    parser.add_argument("--no-variants", action="store_true", help="skip child-process variants")
+    parser.add_argument("--output", default="-", help="report file, - for stdout")
+    parser.add_argument("--compare", metavar="REPORT", help="print p50/p99 changes against a report")
+    return parser.parse_args(argv)
+
+
+def log(message):
+    print(f"[bench] {message}", file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Configuration is read from the environment when the app is imported
+    workdir = tempfile.mkdtemp(prefix="leauction-bench-")
+    run_db = os.path.join(workdir, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{run_db}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(workdir, "uploads")
+    os.environ["DEFER_BACKGROUND_TASKS"] = "1"
+    for pair in args.env:
+        key, _, value = pair.partition("=")
+        os.environ[key] = value
+
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    from app import create_app
+    from benchmarks.data import build_database, parse_scale, row_counts
+    from benchmarks.harness import QueryCounter
+    from benchmarks.scenarios import SCENARIOS, Context
+
+    items = parse_scale(args.scale)
+    cached_db = args.db or os.path.join(DATA_DIR, f"bench-{items}-seed{args.seed}.db")
+    fresh = args.rebuild or not os.path.exists(cached_db)
+    if not fresh:
+        shutil.copyfile(cached_db, run_db)
+
+    try:
+        app = create_app()
+        if fresh:
+            log(f"building {items} items into {cached_db}")
+            build_database(app, items, args.seed, log=log)
+            os.makedirs(os.path.dirname(os.path.abspath(cached_db)), exist_ok=True)
+            shutil.copyfile(run_db, cached_db)
+
+        counter = QueryCounter(app)
+        ctx = Context(app, counter, args.requests, args.threads, args.seed)
+        names = args.only or list(SCENARIOS)
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            sys.exit(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        results = {}
+        for name in names:
+            if SCENARIOS[name].needs_bid_targets and not ctx.bid_targets:
+                log(f"skipping {name}: no active item to bid on at this scale")
+                continue
+            log(f"running {name}")
+            started = time.perf_counter()
+            results.update(SCENARIOS[name](ctx))
+            variant_env = SCENARIOS[name].variant_env
+            if variant_env and not args.no_variants:
+                results.update(_run_variant(args, cached_db, name, variant_env))
+            log(f"{name} done in {time.perf_counter() - started:.1f}s")
+
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "git_commit": _git_commit(),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "scale": items,
+                "seed": args.seed,
+                "requests": args.requests,
+                "threads": args.threads,
+                "rows": row_counts(app),
+                "config": {
+                    key: app.config[key]
+                    for key in (
+                        "READONLY_ENGINE", "FAST_JSON", "BCRYPT_ROUNDS",
+                        "PASSWORD_HASH_WORKERS", "PASSWORD_HASH_MAX_PENDING",
+                    )
+                },
+                "env": args.env,
+            },
+            "results": results,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        log(f"report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            _print_comparison(json.load(f)["results"], results)
+
+
+def _run_variant(args, cached_db, name, variant_env):
+    """Run one scenario again in a child process with ``variant_env`` applied."""
+    suffix = ",".join(f"{k.lower()}={v}" for k, v in variant_env.items())
+    command = [
+        sys.executable, "-m", "benchmarks",
+        "--db", cached_db, "--scale", args.scale, "--seed", str(args.seed),
+        "--only", name, "--requests", str(args.requests), "--threads", str(args.threads),
+        "--no-variants", "--output", "-",
+    ]
+    for pair in args.env + [f"{k}={v}" for k, v in variant_env.items()]:
+        command += ["--env", pair]
+    log(f"running {name} [{suffix}] in a child process")
+    completed = subprocess.run(
+        command, cwd=os.path.dirname(BENCH_DIR), check=True, stdout=subprocess.PIPE, text=True
+    )
+    child = json.loads(completed.stdout)["results"]
+    return {f"{key}[{suffix}]": value for key, value in child.items()}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_comparison(baseline, current):
+    print(f"{'metric':<48} {'p50 ms':>18} {'p99 ms':>18}", file=sys.stderr)
+    for key, result in current.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        cells = []
+        for field in ("p50_ms", "p99_ms"):
+            before, after = old.get(field), result.get(field)
+            if before and after is not None:
+                cells.append(f"{before:>7.2f}→{after:<7.2f}{(after - before) / before:+.0%}")
+            else:
+                cells.append("")
+        print(f"{key:<48} {cells[0]:>18} {cells[1]:>18}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""回归检查：在临时的小数据库上验证并发和查询数量等不变量，失败时以非零状态退出。
+
+    cd backend
+    python -m benchmarks.checks
+    python -m benchmarks.checks --only bid_concurrency --threads 20 --bids 50
+    python -m benchmarks.checks --only card_query_count
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timezone, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHECKS = {}
+# card_query_count 比较的两种页大小，大页不应比小页多出查询
+SMALL_PAGE, LARGE_PAGE = 5, 50
+
+
+class CheckFailed(AssertionError):
+    pass
+
+
+def check(name):
+    def register(fn):
+        CHECKS[name] = fn
+        return fn
+    return register
+
+
+def expect(condition, message):
+    if not condition:
+        raise CheckFailed(message)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.checks",
+        description="Check LeAuction invariants against a fresh temporary database.",
+    )
+    parser.add_argument("--only", nargs="+", metavar="CHECK", help="checks to run")
+    parser.add_argument("--threads", type=int, default=20, help="concurrent bidders")
+    parser.add_argument("--bids", type=int, default=50, help="bids per bidder")
+    return parser.parse_args(argv)
+
+
+def log(message):
+    print(f"[check] {message}", file=sys.stderr, flush=True)
+
+
+def _create_users(n):
+    from app import db
+    from app.models import User
+
+    start = (db.session.scalar(db.select(db.func.max(User.id))) or 0) + 1
+    now = datetime.now(timezone.utc)
+    db.session.execute(User.__table__.insert(), [
+        {
+            "id": uid,
+            "email": f"check{uid}@checks.local",
+            "password_hash": "!",  # Never logs in; tokens are issued directly
+            "nickname": f"检查{uid}",
+            "avatar_url": "",
+            "created_at": now,
+        }
+        for uid in range(start, start + n)
+    ])
+    db.session.commit()
+    return list(range(start, start + n))
+
+
+def _create_item(seller_id, **fields):
+    from app import db
+    from app.models import AuctionItem
+
+    now = datetime.now(timezone.utc)
+    item = AuctionItem(
+        seller_id=seller_id,
+        title=fields.pop("title", "并发检查拍品"),
+        description="",
+        category="other",
+        condition="good",
+        starting_price=1.0,
+        increment=1.0,
+        current_price=1.0,
+        status=AuctionItem.STATUS_ACTIVE,
+        start_time=now,
+        end_time=now + timedelta(days=1),
+        created_at=now,
+        updated_at=now,
+        **fields,
+    )
+    db.session.add(item)
+    db.session.commit()
+    return item.id
+
+
+def _bid_round(app, item_id, bidders, bids_per_bidder):
+    """Every bidder places ``bids_per_bidder`` bids at once; returns status code counts."""
+    from flask_jwt_extended import create_access_token
+
+    from app import db
+    from app.models import AuctionItem
+
+    with app.app_context():
+        headers = {
+            uid: {"Authorization": f"Bearer {create_access_token(identity=str(uid))}"}
+            for uid in bidders
+        }
+    codes = {}
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(bidders))
+
+    def bidder(t, uid):
+        rng = random.Random(t)
+        client = app.test_client()
+        local = {}
+        barrier.wait()
+        for _ in range(bids_per_bidder):
+            with app.app_context():
+                item = db.session.get(AuctionItem, item_id)
+                # Usually the minimum, sometimes a jump: both race each other
+                amount = item.current_price + item.increment * rng.choice((1, 1, 2, 3))
+            code = client.post(
+                f"/api/bids/item/{item_id}", json={"amount": amount}, headers=headers[uid]
+            ).status_code
+            local[code] = local.get(code, 0) + 1
+        with lock:
+            for code, n in local.items():
+                codes[code] = codes.get(code, 0) + n
+
+    threads = [threading.Thread(target=bidder, args=(t, uid)) for t, uid in enumerate(bidders)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return codes
+
+
+def _check_bid_state(app, item_id, accepted):
+    from app import db
+    from app.models import AuctionItem, Bid
+
+    with app.app_context():
+        item = db.session.get(AuctionItem, item_id)
+        bids = Bid.query.filter_by(item_id=item_id).order_by(Bid.id).all()
+        expect(len(bids) == accepted, f"{accepted} bids accepted but {len(bids)} stored")
+        expect(item.bid_count == len(bids), f"bid_count {item.bid_count} != {len(bids)} bid rows")
+        for previous, bid in zip(bids, bids[1:]):
+            expect(
+                bid.amount >= previous.amount + item.increment,
+                f"bid {bid.id} ({bid.amount}) does not beat bid {previous.id} ({previous.amount})",
+            )
+        if bids:
+            last = bids[-1]
+            expect(item.current_price == last.amount,
+                   f"current_price {item.current_price} != last bid {last.amount}")
+            expect(item.leading_bid_id == last.id,
+                   f"leading_bid_id {item.leading_bid_id} != last bid {last.id}")
+            expect(item.leading_bidder_id == last.bidder_id,
+                   f"leading_bidder_id {item.leading_bidder_id} != {last.bidder_id}")
+        return {"bids": len(bids), "price": item.current_price}
+
+
+@check("bid_concurrency")
+def bid_concurrency(app, args):
+    """Many threads bid on one item; count, price and leader must stay consistent.
+
+    The second round disables the in-process item lock, so only the
+    conditional UPDATE in claim_bid guards the item, as it does between
+    gunicorn workers.
+    """
+    from app.bidding import item_sequencer
+
+    with app.app_context():
+        seller, *bidders = _create_users(args.threads + 1)
+        items = [_create_item(seller), _create_item(seller)]
+
+    results = {}
+    for item_id, mode in zip(items, ("sequenced", "unsequenced")):
+        if mode == "unsequenced":
+            item_sequencer.hold = lambda _item_id: nullcontext()
+        try:
+            codes = _bid_round(app, item_id, bidders, args.bids)
+        finally:
+            item_sequencer.__dict__.pop("hold", None)
+        expect(not any(code >= 500 for code in codes), f"{mode}: server errors {codes}")
+        expect(codes.get(200), f"{mode}: no bid accepted {codes}")
+        state = _check_bid_state(app, item_id, codes.get(200, 0))
+        results[mode] = {**state, "status": codes}
+    return results
+
+
+@check("card_query_count")
+def card_query_count(app, args):
+    """Serializing a page of cards costs the same number of queries at any page size.
+
+    Pages are fetched with every cache cleared, so each card goes through
+    the batched image, seller and like loaders instead of a snapshot.
+    """
+    from flask_jwt_extended import create_access_token
+
+    from app import db
+    from app.cache import item_snapshot_cache, listing_cache, public_user_cache
+    from app.models import ItemImage, ItemLike
+
+    from benchmarks.harness import QueryCounter
+
+    with app.app_context():
+        viewer, *sellers = _create_users(11)
+        item_ids = [
+            _create_item(sellers[i % len(sellers)], title=f"卡片检查{i}")
+            for i in range(LARGE_PAGE + 10)
+        ]
+        db.session.add_all(
+            ItemImage(item_id=item_id, image_url=f"/api/upload/files/card{item_id}_{n}.jpg", sort_order=n)
+            for item_id in item_ids for n in range(2)
+        )
+        db.session.add_all(ItemLike(item_id=item_id, user_id=viewer) for item_id in item_ids[::2])
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(identity=str(viewer))}"}
+
+    client = app.test_client()
+    for item_id in item_ids:
+        response = client.post(f"/api/bids/item/{item_id}", json={"amount": 1.0}, headers=headers)
+        expect(response.status_code == 200, f"bid on {item_id} -> {response.status_code}")
+
+    counter = QueryCounter(app)
+    pages = {
+        "listing": ("/api/items?sort=newest&per_page={}", None),
+        "listing.viewer": ("/api/items?sort=newest&per_page={}", headers),
+        "my_bids": ("/api/items/my-bids?per_page={}", headers),
+    }
+    results = {}
+    for name, (url, page_headers) in pages.items():
+        counts = []
+        for per_page in (SMALL_PAGE, LARGE_PAGE):
+            for cache in (listing_cache, item_snapshot_cache, public_user_cache):
+                cache.invalidate()
+            q0 = counter.count
+            response = client.get(url.format(per_page), headers=page_headers)
+            counts.append(counter.count - q0)
+            expect(response.status_code == 200, f"{name}: GET -> {response.status_code}")
+        expect(
+            counts[1] <= counts[0],
+            f"{name}: {counts[1]} queries for {LARGE_PAGE} cards vs {counts[0]} for {SMALL_PAGE}",
+        )
+        results[name] = {SMALL_PAGE: counts[0], LARGE_PAGE: counts[1]}
+    return results
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Configuration is read from the environment when the app is imported
+    workdir = tempfile.mkdtemp(prefix="leauction-checks-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'checks.db')}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(workdir, "uploads")
+    os.environ["DEFER_BACKGROUND_TASKS"] = "1"
+
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    from app import create_app
+
+    names = args.only or list(CHECKS)
+    unknown = set(names) - set(CHECKS)
+    if unknown:
+        sys.exit(f"unknown check(s): {', '.join(sorted(unknown))}")
+
+    failed = []
+    try:
+        app = create_app()
+        for name in names:
+            try:
+                result = CHECKS[name](app, args)
+            except CheckFailed as exc:
+                failed.append(name)
+                log(f"{name}: FAILED: {exc}")
+            else:
+                log(f"{name}: ok {result}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""合成数据：按拍品数量等比例生成用户、出价、点赞、留言和通知，热度呈长尾分布。"""
+import random
+import time
+from array import array
+from datetime import datetime, timezone, timedelta
+
+from app import db
+from app.models import (
+    AuctionItem,
+    Bid,
+    Comment,
+    ItemImage,
+    ItemLike,
+    Notification,
+    Transaction,
+    User,
+)
+from app.passwords import password_hasher
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+# 所有合成用户共用的登录密码
+PASSWORD = "benchmark123"
+# 用户 1 是重度出价人：在这么多件拍品上出过价（my-bids 场景）
+POWER_BIDDER_ID = 1
+POWER_BIDDER_ITEMS = 5000
+# 每批写入的拍品数
+CHUNK = 5000
+
+ADJECTIVES = ["二手", "全新", "九成新", "限量", "复古", "便携", "无线", "机械", "智能", "原装"]
+NOUNS = [
+    "键盘", "耳机", "台灯", "自行车", "相机", "显示器", "书包", "咖啡机",
+    "手表", "吉他", "教材", "电饭煲", "羽毛球拍", "台式机", "平板",
+]
+BRANDS = ["Sony", "Apple", "Xiaomi", "Logitech", "Canon", "Dell", "Nike", "Lenovo", "Huawei", "Philips"]
+PHRASES = [
+    "自用", "宿舍搬家出", "功能完好", "有轻微划痕", "配件齐全",
+    "支持当面验货", "送收纳袋", "可小刀", "发票保修都在", "仅拆封试用",
+]
+CATEGORIES = ["electronics", "food", "daily", "other"]
+CONDITIONS = ["new", "like_new", "good", "fair"]
+NOTIFICATION_TYPES = [
+    Notification.TYPE_OUTBID,
+    Notification.TYPE_AUCTION_WON,
+    Notification.TYPE_AUCTION_SOLD,
+    Notification.TYPE_AUCTION_UNSOLD,
+    Notification.TYPE_RESERVE_NOT_MET,
+]
+
+# Item status codes used while planning
+_ACTIVE, _ENDED, _DRAFT, _CANCELLED = range(4)
+
+
+def parse_scale(value):
+    """``"10k"``, ``"1m"`` or a plain number of items."""
+    value = value.strip().lower()
+    if value in SCALES:
+        return SCALES[value]
+    return int(value.replace("_", ""))
+
+
+def plan(items):
+    """Row counts for ``items`` auction items."""
+    return {
+        "users": max(items // 5, 200),
+        "items": items,
+        "bids": items * 3,
+        "likes": items,
+        "comments": items // 2,
+        "notifications": items,
+    }
+
+
+def _skewed(rng, n, power=3.0):
+    """Index in [0, n) with a long tail: low indexes are drawn far more often."""
+    return int(n * rng.random() ** power)
+
+
+def _spread(rng, total, slots, power=3.0):
+    """Distribute ``total`` events over ``slots`` (in popularity order)."""
+    counts = array("I", bytes(4 * len(slots)))
+    n = len(slots)
+    for _ in range(total if n else 0):
+        counts[_skewed(rng, n, power)] += 1
+    return {slots[rank]: count for rank, count in enumerate(counts) if count}
+
+
+def build_database(app, items, seed=1, log=print):
+    """Fill the (empty) database of ``app`` with a synthetic marketplace."""
+    rng = random.Random(seed)
+    counts = plan(items)
+    n_users = counts["users"]
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+
+    with app.app_context():
+        password_hash = password_hasher.hash(PASSWORD)
+        users = [
+            {
+                "id": uid,
+                "email": f"user{uid}@bench.local",
+                "password_hash": password_hash,
+                "nickname": f"用户{uid}",
+                "avatar_url": "",
+                "created_at": now - timedelta(days=rng.uniform(30, 365)),
+            }
+            for uid in range(1, n_users + 1)
+        ]
+        for i in range(0, len(users), 20_000):
+            db.session.execute(User.__table__.insert(), users[i:i + 20_000])
+        db.session.commit()
+        log(f"users: {n_users}")
+
+        statuses = bytearray(
+            rng.choices((_ACTIVE, _ENDED, _DRAFT, _CANCELLED), (60, 30, 5, 5), k=items)
+        )
+        biddable = [
+            item_id for item_id in range(1, items + 1)
+            if statuses[item_id - 1] in (_ACTIVE, _ENDED)
+        ]
+        rng.shuffle(biddable)  # Popularity order, unrelated to age
+        bid_counts = _spread(rng, counts["bids"], biddable)
+        like_counts = _spread(rng, counts["likes"], biddable, power=2.0)
+        comment_counts = _spread(rng, counts["comments"], biddable, power=2.0)
+        power_items = set(rng.sample(biddable, min(POWER_BIDDER_ITEMS, len(biddable) // 2)))
+        for item_id in power_items:
+            bid_counts[item_id] = max(bid_counts.get(item_id, 0), 1)
+
+        next_bid_id = 1
+        for chunk_start in range(1, items + 1, CHUNK):
+            item_rows, bid_rows, image_rows, like_rows = [], [], [], []
+            comment_rows, transaction_rows = [], []
+            for item_id in range(chunk_start, min(chunk_start + CHUNK, items + 1)):
+                status = statuses[item_id - 1]
+                seller_id = 1 + _skewed(rng, n_users, 2.0)
+                starting_price = float(round(rng.lognormvariate(4, 1.2)) + 1)
+                increment = rng.choice((1.0, 1.0, 5.0, 10.0))
+                reserve_price = (
+                    round(starting_price * rng.uniform(1.5, 4), 2) if rng.random() < 0.2 else None
+                )
+                if status == _ACTIVE:
+                    created_at = now - timedelta(seconds=rng.uniform(0, 7 * 86400))
+                    end_time = now + timedelta(seconds=rng.uniform(600, 7 * 86400))
+                elif status == _DRAFT:
+                    created_at = now - timedelta(seconds=rng.uniform(0, 30 * 86400))
+                    end_time = None
+                else:
+                    end_time = now - timedelta(seconds=rng.uniform(3600, 60 * 86400))
+                    created_at = end_time - timedelta(days=7)
+                start_time = created_at if status != _DRAFT else None
+
+                # Bids: strictly increasing amounts from distinct consecutive bidders
+                n_bids = bid_counts.get(item_id, 0)
+                price = starting_price
+                leader = leading_bid_id = None
+                last_activity = created_at
+                if n_bids:
+                    window = ((end_time if status == _ENDED else now) - created_at).total_seconds()
+                    power_at = rng.randrange(n_bids) if item_id in power_items else -1
+                    for j in range(n_bids):
+                        if j:
+                            price += increment * rng.choice((1, 1, 1, 2, 5))
+                        if j == power_at and seller_id != POWER_BIDDER_ID and leader != POWER_BIDDER_ID:
+                            bidder = POWER_BIDDER_ID
+                        else:
+                            bidder = 1 + _skewed(rng, n_users, 2.0)
+                            while bidder in (seller_id, leader):
+                                bidder = rng.randint(1, n_users)
+                        last_activity = created_at + timedelta(seconds=window * (j + 1) / (n_bids + 1))
+                        bid_rows.append({
+                            "id": next_bid_id,
+                            "item_id": item_id,
+                            "bidder_id": bidder,
+                            "amount": price,
+                            "created_at": last_activity,
+                        })
+                        leader, leading_bid_id = bidder, next_bid_id
+                        next_bid_id += 1
+
+                winner_id = None
+                if status == _ACTIVE:
+                    status_name = AuctionItem.STATUS_ACTIVE
+                elif status == _DRAFT:
+                    status_name = AuctionItem.STATUS_DRAFT
+                elif status == _CANCELLED:
+                    status_name = AuctionItem.STATUS_CANCELLED
+                elif n_bids and (reserve_price is None or price >= reserve_price):
+                    status_name = (
+                        AuctionItem.STATUS_COMPLETED if rng.random() < 0.1 else AuctionItem.STATUS_ENDED_WON
+                    )
+                    winner_id = leader
+                    done = status_name == AuctionItem.STATUS_COMPLETED
+                    transaction_rows.append({
+                        "item_id": item_id,
+                        "seller_id": seller_id,
+                        "buyer_id": leader,
+                        "final_price": price,
+                        "seller_confirmed": done,
+                        "buyer_confirmed": done,
+                        "created_at": end_time,
+                        "completed_at": end_time + timedelta(days=2) if done else None,
+                    })
+                else:
+                    status_name = AuctionItem.STATUS_ENDED_UNSOLD
+
+                n_likes = min(like_counts.get(item_id, 0), n_users - 1)
+                for user_id in rng.sample(range(1, n_users + 1), n_likes):
+                    like_rows.append({
+                        "item_id": item_id,
+                        "user_id": user_id,
+                        "created_at": created_at + timedelta(seconds=rng.uniform(0, 86400)),
+                    })
+                for _ in range(comment_counts.get(item_id, 0)):
+                    comment_rows.append({
+                        "item_id": item_id,
+                        "user_id": 1 + _skewed(rng, n_users, 2.0),
+                        "content": rng.choice(PHRASES) + "，还在吗？",
+                        "created_at": created_at + timedelta(seconds=rng.uniform(0, 86400)),
+                    })
+                for sort_order in range(rng.randint(1, 3)):
+                    image_rows.append({
+                        "item_id": item_id,
+                        "image_url": f"/api/upload/files/bench{item_id:07d}{sort_order}.jpg",
+                        "sort_order": sort_order,
+                    })
+
+                noun = rng.choice(NOUNS)
+                item_rows.append({
+                    "id": item_id,
+                    "seller_id": seller_id,
+                    "title": f"{rng.choice(ADJECTIVES)}{rng.choice(BRANDS)}{noun} #{item_id}",
+                    "description": "，".join(rng.sample(PHRASES, 3)) + f"。{noun}诚心出售。",
+                    "category": rng.choice(CATEGORIES),
+                    "condition": rng.choice(CONDITIONS),
+                    "starting_price": starting_price,
+                    "reserve_price": reserve_price,
+                    "increment": increment,
+                    # Buyouts only where the bidding stayed well below them
+                    "buyout_price": (
+                        round(price * 20, 2) if n_bids <= 3 and rng.random() < 0.15 else None
+                    ),
+                    "current_price": price,
+                    "bid_count": n_bids,
+                    "view_count": int(rng.paretovariate(1.2) * 10),
+                    "like_count": n_likes,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "status": status_name,
+                    "winner_id": winner_id,
+                    "leading_bid_id": leading_bid_id,
+                    "leading_bidder_id": leader,
+                    "created_at": created_at,
+                    "updated_at": last_activity,
+                })
+
+            db.session.execute(AuctionItem.__table__.insert(), item_rows)
+            for model, rows in (
+                (Bid, bid_rows),
+                (ItemImage, image_rows),
+                (ItemLike, like_rows),
+                (Comment, comment_rows),
+                (Transaction, transaction_rows),
+            ):
+                if rows:
+                    db.session.execute(model.__table__.insert(), rows)
+            db.session.commit()
+            log(f"items: {min(chunk_start + CHUNK - 1, items)}/{items}")
+
+        for start in range(0, counts["notifications"], 20_000):
+            rows = []
+            for _ in range(start, min(start + 20_000, counts["notifications"])):
+                ntype = rng.choice(NOTIFICATION_TYPES)
+                rows.append({
+                    "user_id": 1 + _skewed(rng, n_users),
+                    "type": ntype,
+                    "title": ntype,
+                    "content": f"「{rng.choice(NOUNS)}」{rng.choice(PHRASES)}",
+                    "related_item_id": rng.randint(1, items),
+                    "is_read": rng.random() < 0.7,
+                    "created_at": now - timedelta(seconds=rng.uniform(0, 60 * 86400)),
+                })
+            db.session.execute(Notification.__table__.insert(), rows)
+            db.session.commit()
+        log(f"notifications: {counts['notifications']}")
+
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.commit()
+    log(f"built in {time.perf_counter() - started:.1f}s")
+
+
+def row_counts(app):
+    """Actual row counts of the benchmark database, for the report."""
+    with app.app_context():
+        return {
+            model.__tablename__: db.session.query(db.func.count(model.id)).scalar()
+            for model in (User, AuctionItem, Bid, ItemLike, Comment, Notification, Transaction)
+        }
@@ -0,0 +1,113 @@
+"""计时与统计：延迟分位数、每请求 SQL 条数，以及串行 / 并发两种压测方式。"""
+import math
+import threading
+import time
+
+from sqlalchemy import event
+
+from app import db
+
+
+class QueryCounter:
+    """Counts SQL statements per thread on every engine of the app."""
+
+    def __init__(self, app):
+        self._local = threading.local()
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *_args):
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    @property
+    def count(self):
+        return getattr(self._local, "count", 0)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, queries=None, elapsed=None, **extra):
+    """Report entry for latencies in seconds (plus query counts per call)."""
+    ms = sorted(s * 1000 for s in samples)
+    result = {
+        "n": len(ms),
+        "p50_ms": _round(percentile(ms, 50)),
+        "p95_ms": _round(percentile(ms, 95)),
+        "p99_ms": _round(percentile(ms, 99)),
+        "mean_ms": _round(sum(ms) / len(ms)) if ms else None,
+        "max_ms": _round(ms[-1]) if ms else None,
+    }
+    if queries:
+        result["queries_per_call"] = round(sum(queries) / len(queries), 2)
+        result["max_queries"] = max(queries)
+    if elapsed:
+        result["throughput_per_s"] = round(len(ms) / elapsed, 1)
+    result.update(extra)
+    return result
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def run_serial(counter, n, call, before=None):
+    """Time ``call(i)`` ``n`` times on this thread; ``before(i)`` is untimed."""
+    samples, queries = [], []
+    started = time.perf_counter()
+    for i in range(n):
+        if before:
+            before(i)
+        q0 = counter.count
+        t0 = time.perf_counter()
+        call(i)
+        samples.append(time.perf_counter() - t0)
+        queries.append(counter.count - q0)
+    return samples, queries, time.perf_counter() - started
+
+
+def run_concurrent(counter, threads, n_per_thread, call):
+    """Run ``call(thread_index, i)`` from ``threads`` threads at once.
+
+    Returns per-call latencies, query counts and the call results (e.g.
+    status codes), plus the wall time of the whole run.
+    """
+    samples, queries, results = [], [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(t):
+        local_samples, local_queries, local_results = [], [], []
+        barrier.wait()
+        for i in range(n_per_thread):
+            q0 = counter.count
+            t0 = time.perf_counter()
+            result = call(t, i)
+            local_samples.append(time.perf_counter() - t0)
+            local_queries.append(counter.count - q0)
+            local_results.append(result)
+        with lock:
+            samples.extend(local_samples)
+            queries.extend(local_queries)
+            results.extend(local_results)
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return samples, queries, results, time.perf_counter() - started
+
+
+def status_counts(codes):
+    counts = {}
+    for code in codes:
+        counts[str(code)] = counts.get(str(code), 0) + 1
+    return counts
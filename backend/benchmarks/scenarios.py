@@ -0,0 +1,483 @@
+"""压测场景：每个场景返回 {指标名: 统计结果}，按注册顺序执行（会修改数据的场景排在最后）。"""
+import itertools
+import random
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.cache import item_snapshot_cache, listing_cache
+from app.json_provider import FastJSONProvider
+from app.models import AuctionItem, Comment, Notification, User
+from app.outbox import notification_worker
+from app.scheduler import check_expired_auctions
+
+from benchmarks.data import PASSWORD, POWER_BIDDER_ID
+from benchmarks.harness import run_concurrent, run_serial, status_counts, summarize
+
+SCENARIOS = {}
+# 单次截止处理的拍品数上限
+FINALIZE_ITEMS = 10_000
+# 出价者从前 1/10 的用户中选取（最多 200 人），他们卖出的拍品不作为出价目标
+MAX_BIDDERS = 200
+
+
+def scenario(name, variant_env=None, needs_bid_targets=False):
+    """Register a scenario; ``variant_env`` also runs it in a child process with that env.
+
+    Scenarios with ``needs_bid_targets`` are skipped when the database has
+    no item to bid on.
+    """
+    def register(fn):
+        fn.variant_env = variant_env
+        fn.needs_bid_targets = needs_bid_targets
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+
+class Context:
+    """Shared state for scenarios: the app, sampled ids and auth headers."""
+
+    def __init__(self, app, counter, requests, threads, seed):
+        self.app = app
+        self.counter = counter
+        self.requests = requests
+        self.threads = threads
+        self.rng = random.Random(seed)
+        self._headers = {}
+        with app.app_context():
+            active = AuctionItem.status == AuctionItem.STATUS_ACTIVE
+            self.hot_items = _ids(
+                db.session.query(AuctionItem.id).filter(active)
+                .order_by(AuctionItem.bid_count.desc()).limit(50)
+            )
+            self.active_items = _ids(
+                db.session.query(AuctionItem.id).filter(active)
+                .order_by(db.func.random()).limit(2000)
+            )
+            # Bidders are users 2..last_bidder; small databases still get a few
+            n_users = db.session.scalar(db.select(db.func.max(User.id))) or 0
+            self.last_bidder = max(2, min(MAX_BIDDERS, n_users // 10))
+            # Bid targets: far from their end, without a buyout price and not
+            # sold by a bidder
+            self.bid_targets = _ids(
+                db.session.query(AuctionItem.id)
+                .filter(
+                    active,
+                    AuctionItem.buyout_price.is_(None),
+                    AuctionItem.end_time > datetime.now(timezone.utc) + timedelta(hours=2),
+                    AuctionItem.seller_id > self.last_bidder,
+                )
+                .order_by(db.func.random()).limit(2000)
+            )
+            self.commented_items = _ids(
+                db.session.query(Comment.item_id)
+                .group_by(Comment.item_id)
+                .order_by(db.func.count().desc()).limit(50)
+            )
+            self.inbox_user = db.session.scalar(
+                db.select(Notification.user_id)
+                .group_by(Notification.user_id)
+                .order_by(db.func.count().desc()).limit(1)
+            )
+
+    def headers(self, user_id):
+        if user_id not in self._headers:
+            with self.app.app_context():
+                token = create_access_token(identity=str(user_id))
+            self._headers[user_id] = {"Authorization": f"Bearer {token}"}
+        return self._headers[user_id]
+
+    def pick_item(self, rng=None):
+        """A viewed item: mostly the hot ones, sometimes any active item."""
+        rng = rng or self.rng
+        pool = self.hot_items if rng.random() < 0.8 else self.active_items
+        return rng.choice(pool)
+
+    def bidder(self, rng=None):
+        # Bidders never sell a bid target (seller_id > last_bidder)
+        return (rng or self.rng).randint(2, self.last_bidder)
+
+
+def _ids(query):
+    return [row[0] for row in query]
+
+
+def _get(client, url, headers=None, expect=200):
+    response = client.get(url, headers=headers)
+    if response.status_code != expect:
+        raise RuntimeError(f"GET {url} -> {response.status_code}: {response.data[:200]!r}")
+    return response
+
+
+@scenario("list_items")
+def list_items(ctx):
+    client = ctx.app.test_client()
+    urls = {
+        "newest": "/api/items?sort=newest",
+        "ending_soon": "/api/items?sort=ending_soon&status=active",
+        "category_price_low": "/api/items?category=electronics&sort=price_low",
+        "most_bids": "/api/items?sort=most_bids&status=active",
+        "search_fts": "/api/items?search=Logitech键盘&sort=relevance",
+        "search_short": "/api/items?search=键盘",
+        "deep_page": "/api/items?sort=newest&page=200",
+    }
+    first = _get(client, "/api/items?sort=newest&cursor=").json
+    urls["cursor_page"] = f"/api/items?sort=newest&cursor={first['next_cursor']}"
+
+    results = {}
+    for name, url in urls.items():
+        samples, queries, elapsed = run_serial(
+            ctx.counter, ctx.requests,
+            lambda _i: _get(client, url),
+            before=lambda _i: listing_cache.invalidate(),
+        )
+        results[f"list_items.{name}"] = summarize(samples, queries, elapsed)
+    samples, queries, elapsed = run_serial(
+        ctx.counter, ctx.requests, lambda _i: _get(client, urls["newest"])
+    )
+    results["list_items.cached"] = summarize(samples, queries, elapsed)
+    return results
+
+
+@scenario("get_item")
+def get_item(ctx):
+    client = ctx.app.test_client()
+    samples, queries, elapsed = run_serial(
+        ctx.counter, ctx.requests, lambda _i: _get(client, f"/api/items/{ctx.pick_item()}")
+    )
+    results = {"get_item": summarize(samples, queries, elapsed)}
+
+    item_id = ctx.hot_items[0]
+    etag = _get(client, f"/api/items/{item_id}").headers["ETag"]
+    samples, queries, elapsed = run_serial(
+        ctx.counter, ctx.requests,
+        lambda _i: _get(client, f"/api/items/{item_id}", {"If-None-Match": etag}, expect=304),
+    )
+    results["get_item.not_modified"] = summarize(samples, queries, elapsed)
+    return results
+
+
+@scenario("item_children")
+def item_children(ctx):
+    client = ctx.app.test_client()
+    samples, queries, elapsed = run_serial(
+        ctx.counter, ctx.requests,
+        lambda _i: _get(client, f"/api/bids/item/{ctx.rng.choice(ctx.hot_items)}?limit=20"),
+    )
+    results = {"get_bids": summarize(samples, queries, elapsed)}
+    samples, queries, elapsed = run_serial(
+        ctx.counter, ctx.requests,
+        lambda _i: _get(
+            client, f"/api/items/{ctx.rng.choice(ctx.commented_items)}/comments?cursor="
+        ),
+    )
+    results["list_comments"] = summarize(samples, queries, elapsed)
+    return results
+
+
+@scenario("user_pages")
+def user_pages(ctx):
+    client = ctx.app.test_client()
+    inbox = ctx.headers(ctx.inbox_user)
+    power = ctx.headers(POWER_BIDDER_ID)
+    urls = {
+        "notifications": ("/api/notifications?cursor=", inbox),
+        "notifications.unread_count": ("/api/notifications/unread-count", inbox),
+        "my_bids": ("/api/items/my-bids?per_page=20", power),
+        "my_bids.active": ("/api/items/my-bids?per_page=20&status=active", power),
+        "my_bids.deep_page": ("/api/items/my-bids?per_page=20&page=100", power),
+    }
+    results = {}
+    for name, (url, headers) in urls.items():
+        samples, queries, elapsed = run_serial(
+            ctx.counter, ctx.requests, lambda _i: _get(client, url, headers)
+        )
+        results[name] = summarize(samples, queries, elapsed)
+    return results
+
+
+@scenario("serialization")
+def serialization(ctx):
+    """A page of 50 cards: cold vs. cached snapshots, stdlib vs. fast JSON."""
+    results = {}
+    with ctx.app.app_context():
+        items = (
+            AuctionItem.query.filter(AuctionItem.status == AuctionItem.STATUS_ACTIVE)
+            .order_by(AuctionItem.id.desc()).limit(50).all()
+        )
+        samples, queries, elapsed = run_serial(
+            ctx.counter, ctx.requests,
+            lambda _i: AuctionItem.to_card_dicts(items),
+            before=lambda _i: item_snapshot_cache.invalidate(),
+        )
+        results["cards50.cold"] = summarize(samples, queries, elapsed)
+        samples, queries, elapsed = run_serial(
+            ctx.counter, ctx.requests, lambda _i: AuctionItem.to_card_dicts(items)
+        )
+        results["cards50.cached"] = summarize(samples, queries, elapsed)
+
+        payload = {"items": AuctionItem.to_card_dicts(items)}
+        for name, provider in (
+            ("stdlib", DefaultJSONProvider(ctx.app)),
+            ("fast", FastJSONProvider(ctx.app)),
+        ):
+            samples, _queries, elapsed = run_serial(
+                ctx.counter, ctx.requests,
+                lambda _i: provider.dumps(payload, separators=(",", ":")),
+            )
+            results[f"cards50.json_{name}"] = summarize(samples, elapsed=elapsed)
+    return results
+
+
+@scenario("search_fts_vs_like")
+def search_fts_vs_like(ctx):
+    """The listing search through the FTS index and through the LIKE fallback."""
+    client = ctx.app.test_client()
+    results = {}
+    indexed = ctx.app.extensions.get("search_index")
+    for term in ("Logitech键盘", "咖啡机", "宿舍搬家", "Sony"):
+        url = f"/api/items?search={term}&with_total=true"
+        for mode, enabled in (("fts", indexed), ("like", False)):
+            if mode == "fts" and not indexed:
+                continue
+            ctx.app.extensions["search_index"] = enabled
+            try:
+                samples, queries, elapsed = run_serial(
+                    ctx.counter, max(ctx.requests // 10, 5),
+                    lambda _i: _get(client, url),
+                    before=lambda _i: listing_cache.invalidate(),
+                )
+            finally:
+                ctx.app.extensions["search_index"] = indexed
+            results[f"search.{mode}.{term}"] = summarize(samples, queries, elapsed)
+    return results
+
+
+class _BidAmounts:
+    """Next bid amount per item, starting from its current price."""
+
+    def __init__(self, app):
+        self._app = app
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def __call__(self, item_id):
+        with self._lock:
+            if item_id not in self._next:
+                with self._app.app_context():
+                    price, increment, bid_count = db.session.execute(
+                        db.select(
+                            AuctionItem.current_price,
+                            AuctionItem.increment,
+                            AuctionItem.bid_count,
+                        ).where(AuctionItem.id == item_id)
+                    ).one()
+                self._next[item_id] = (price + increment if bid_count else price, increment)
+            amount, increment = self._next[item_id]
+            self._next[item_id] = (amount + increment, increment)
+            return amount
+
+
+@scenario("place_bid", needs_bid_targets=True)
+def place_bid(ctx):
+    client = ctx.app.test_client()
+    amounts = _BidAmounts(ctx.app)
+    targets = itertools.cycle(ctx.bid_targets)
+    codes = []
+
+    def bid(_i):
+        item_id = next(targets)
+        response = client.post(
+            f"/api/bids/item/{item_id}",
+            json={"amount": amounts(item_id)},
+            headers=ctx.headers(ctx.bidder()),
+        )
+        codes.append(response.status_code)
+
+    samples, queries, elapsed = run_serial(ctx.counter, ctx.requests, bid)
+    results = {"place_bid": summarize(samples, queries, elapsed, status=status_counts(codes))}
+
+    # Contention: every thread bids on the same few items
+    hot = ctx.bid_targets[:5]
+    clients = [ctx.app.test_client() for _ in range(ctx.threads)]
+    rngs = [random.Random(t) for t in range(ctx.threads)]
+
+    def contended(t, i):
+        item_id = hot[(t + i) % len(hot)]
+        return clients[t].post(
+            f"/api/bids/item/{item_id}",
+            json={"amount": amounts(item_id)},
+            headers=ctx.headers(ctx.bidder(rngs[t])),
+        ).status_code
+
+    samples, queries, codes, elapsed = run_concurrent(
+        ctx.counter, ctx.threads, max(ctx.requests // ctx.threads, 1), contended
+    )
+    results["place_bid.concurrent_hot"] = summarize(
+        samples, queries, elapsed, threads=ctx.threads, status=status_counts(codes)
+    )
+    return results
+
+
+@scenario("mixed_read_bid", variant_env={"READONLY_ENGINE": "0"}, needs_bid_targets=True)
+def mixed_read_bid(ctx):
+    """90% reads (detail, listing, bid history) and 10% bids from many threads."""
+    amounts = _BidAmounts(ctx.app)
+    clients = [ctx.app.test_client() for _ in range(ctx.threads)]
+    rngs = [random.Random(100 + t) for t in range(ctx.threads)]
+
+    def op(t, _i):
+        rng, client = rngs[t], clients[t]
+        roll = rng.random()
+        if roll < 0.1:
+            item_id = rng.choice(ctx.bid_targets[:200])
+            code = client.post(
+                f"/api/bids/item/{item_id}",
+                json={"amount": amounts(item_id)},
+                headers=ctx.headers(ctx.bidder(rng)),
+            ).status_code
+            return "bid", code
+        if roll < 0.55:
+            url = f"/api/items/{ctx.pick_item(rng)}"
+        elif roll < 0.8:
+            url = f"/api/items?sort={rng.choice(['newest', 'ending_soon', 'most_bids'])}"
+        else:
+            url = f"/api/bids/item/{rng.choice(ctx.hot_items)}?limit=20"
+        return "read", client.get(url).status_code
+
+    samples, queries, results, elapsed = run_concurrent(
+        ctx.counter, ctx.threads, max(ctx.requests * 2 // ctx.threads, 1), op
+    )
+    report = {}
+    for kind in ("read", "bid"):
+        picked = [i for i, (k, _code) in enumerate(results) if k == kind]
+        report[f"mixed.{kind}"] = summarize(
+            [samples[i] for i in picked],
+            [queries[i] for i in picked],
+            elapsed,
+            threads=ctx.threads,
+            readonly_engine=ctx.app.config["READONLY_ENGINE"],
+            status=status_counts(results[i][1] for i in picked),
+        )
+    return report
+
+
+@scenario("login_vs_bids", needs_bid_targets=True)
+def login_vs_bids(ctx):
+    """Bid latency alone, then while a login spike saturates password hashing."""
+    amounts = _BidAmounts(ctx.app)
+    bid_threads = max(ctx.threads // 2, 1)
+    clients = [ctx.app.test_client() for _ in range(bid_threads)]
+    rngs = [random.Random(200 + t) for t in range(bid_threads)]
+    n_bids = max(ctx.requests // bid_threads, 1)
+
+    def bid(t, _i):
+        item_id = rngs[t].choice(ctx.bid_targets[200:400] or ctx.bid_targets)
+        return clients[t].post(
+            f"/api/bids/item/{item_id}",
+            json={"amount": amounts(item_id)},
+            headers=ctx.headers(ctx.bidder(rngs[t])),
+        ).status_code
+
+    samples, queries, codes, elapsed = run_concurrent(ctx.counter, bid_threads, n_bids, bid)
+    results = {"bids.without_logins": summarize(samples, queries, elapsed, status=status_counts(codes))}
+
+    stop = threading.Event()
+    login_codes, login_times = [], []
+    lock = threading.Lock()
+
+    def login(t):
+        client = ctx.app.test_client()
+        rng = random.Random(300 + t)
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            code = client.post(
+                "/api/auth/login",
+                json={"email": f"user{ctx.bidder(rng)}@bench.local", "password": PASSWORD},
+            ).status_code
+            with lock:
+                login_codes.append(code)
+                login_times.append(time.perf_counter() - t0)
+
+    login_threads = [threading.Thread(target=login, args=(t,)) for t in range(ctx.threads)]
+    # Start the hashing pool outside the measurement
+    ctx.app.test_client().post(
+        "/api/auth/login", json={"email": "user2@bench.local", "password": PASSWORD}
+    )
+    login_started = time.perf_counter()
+    for thread in login_threads:
+        thread.start()
+    time.sleep(0.5)  # Let the spike build up
+    samples, queries, codes, elapsed = run_concurrent(ctx.counter, bid_threads, n_bids, bid)
+    stop.set()
+    for thread in login_threads:
+        thread.join()
+    login_elapsed = time.perf_counter() - login_started
+
+    results["bids.during_logins"] = summarize(samples, queries, elapsed, status=status_counts(codes))
+    ok = sum(1 for code in login_codes if code == 200)
+    results["login"] = summarize(
+        login_times,
+        elapsed=login_elapsed,
+        threads=ctx.threads,
+        succeeded_per_s=round(ok / login_elapsed, 1),
+        bcrypt_rounds=ctx.app.config["BCRYPT_ROUNDS"],
+        hash_workers=ctx.app.config["PASSWORD_HASH_WORKERS"],
+        status=status_counts(login_codes),
+    )
+    return results
+
+
+@scenario("finalize")
+def finalize(ctx):
+    """End up to 10k auctions at once, finalize them and expand the notifications."""
+    with ctx.app.app_context():
+        now = datetime.now(timezone.utc)
+        ids = _ids(
+            db.session.query(AuctionItem.id)
+            .filter(AuctionItem.status == AuctionItem.STATUS_ACTIVE)
+            .order_by(db.func.random()).limit(FINALIZE_ITEMS)
+        )
+        db.session.execute(
+            db.update(AuctionItem)
+            .where(AuctionItem.id.in_(ids))
+            .values(end_time=now - timedelta(seconds=1))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    q0 = ctx.counter.count
+    t0 = time.perf_counter()
+    check_expired_auctions(ctx.app)
+    finalize_elapsed = time.perf_counter() - t0
+    finalize_queries = ctx.counter.count - q0
+
+    events = notifications = 0
+    t0 = time.perf_counter()
+    before = notification_worker.notifications
+    while True:
+        taken = notification_worker.drain(ctx.app)
+        if not taken:
+            break
+        events += taken
+    drain_elapsed = time.perf_counter() - t0
+    notifications = notification_worker.notifications - before
+
+    return {
+        "finalize": summarize(
+            [finalize_elapsed], [finalize_queries],
+            items=len(ids),
+            items_per_s=round(len(ids) / finalize_elapsed, 1) if finalize_elapsed else None,
+        ),
+        "finalize.outbox_drain": summarize(
+            [drain_elapsed],
+            events=events,
+            notifications=notifications,
+            notifications_per_s=round(notifications / drain_elapsed, 1) if drain_elapsed else None,
+        ),
+    }
@@ -16,8 +16,67 @@ class Config:
         "DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'leauction.db')}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 仅用于文件型 SQLite（内存库使用 SingletonThreadPool，不接受这些参数），由 create_app 合并
+    DB_POOL_OPTIONS = {
+        # 与 gunicorn 每进程线程数相当，SSE 长连接不占用数据库连接
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+    }
+
+    # 每个 SQLite 连接建立时执行的 PRAGMA：WAL 让读不再被写阻塞，写锁冲突时等待而非立即报错
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        "cache_size": -64000,  # 64 MB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+    # GET 请求的查询使用单独的只读连接池（默认指向同一数据库文件；内存库不启用）
+    READONLY_ENGINE = os.getenv("READONLY_ENGINE", "1") == "1"
+    READONLY_DATABASE_URL = os.getenv("READONLY_DATABASE_URL", "")
 
     UPLOAD_FOLDER = os.path.join(BASE_DIR, os.getenv("UPLOAD_FOLDER", "uploads"))
     MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", 5 * 1024 * 1024))
 
     ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+    # 静态文件交给前置代理发送："" 由 Flask 发送，"x-accel"（nginx X-Accel-Redirect）或 "x-sendfile"
+    STATIC_SENDFILE = os.getenv("STATIC_SENDFILE", "")
+    X_ACCEL_UPLOADS_PREFIX = os.getenv("X_ACCEL_UPLOADS_PREFIX", "/_protected/uploads/")
+    X_ACCEL_STATIC_PREFIX = os.getenv("X_ACCEL_STATIC_PREFIX", "/_protected/static/")
+
+    # 生成缩略图 / WebP 变体的后台线程数
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+
+    # 密码哈希：bcrypt 成本因子、进程池大小（0 表示在请求线程内计算）和排队上限，超出上限返回 503
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    # 等待哈希的请求会占住线程：默认上限取每进程请求线程数（GUNICORN_THREADS）的 1/8，
+    # 至少等于进程池大小，登录高峰时其余线程仍留给出价等请求
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv(
+        "PASSWORD_HASH_MAX_PENDING",
+        max(PASSWORD_HASH_WORKERS, 1, int(os.getenv("GUNICORN_THREADS", 32)) // 8),
+    ))
+
+    # 可访问运行状态接口（cache-stats、outbox-stats）的用户 id，逗号分隔；为空时无人可访问
+    ADMIN_USER_IDS = {
+        int(uid) for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip()
+    }
+
+    # 用 orjson（已安装时）编码 JSON 响应
+    FAST_JSON = os.getenv("FAST_JSON", "1") == "1"
+
+    # 公共拍品列表响应缓存
+    LISTING_CACHE_SIZE = int(os.getenv("LISTING_CACHE_SIZE", 256))
+    LISTING_CACHE_TTL = int(os.getenv("LISTING_CACHE_TTL", 30))
+
+    # 浏览量写缓冲的刷新间隔（秒）
+    VIEW_FLUSH_SECONDS = int(os.getenv("VIEW_FLUSH_SECONDS", 10))
+
+    # 多进程部署：持有该文件锁的进程运行定时任务；其余进程通过此目录下的套接字互相广播
+    SCHEDULER_LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE", os.path.join(BASE_DIR, "scheduler.lock"))
+    PROCESS_BUS_DIR = os.getenv("PROCESS_BUS_DIR", "")
+    # gunicorn preload 时后台线程不能在 master 中启动，由 gunicorn.conf.py 在 worker 中启动；
+    # flask 维护命令不启动后台线程（flask run 在收到第一个请求时启动）
+    DEFER_BACKGROUND_TASKS = os.getenv("DEFER_BACKGROUND_TASKS", "") == "1"
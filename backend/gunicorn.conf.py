@@ -0,0 +1,38 @@
+"""gunicorn 生产配置：gunicorn -c gunicorn.conf.py run:app"""
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:5001")
+
+# SQLite 同一时刻只有一个写者，进程多了只会排队等锁；CPU 密集的序列化由少量进程分担
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count() + 1, 4)))
+# 每个 SSE 长连接占用一个线程，线程数决定单进程可同时服务的实时连接数
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 32))
+
+# 在 master 中加载应用一次（建表、升级结构、扫描静态文件），worker fork 后共享
+preload_app = True
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+# Background threads don't survive fork: the app defers them and each worker
+# starts its own in post_worker_init. Workers find each other through the
+# bus directory, which is unique to this master.
+os.environ.setdefault("DEFER_BACKGROUND_TASKS", "1")
+os.environ.setdefault(
+    "PROCESS_BUS_DIR", os.path.join(tempfile.gettempdir(), f"leauction-bus-{os.getpid()}")
+)
+
+
+def post_worker_init(worker):
+    from app import db, start_background_tasks
+
+    app = worker.wsgi
+    with app.app_context():
+        # Connections opened by the master must not be shared across forks
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    start_background_tasks(app)
@@ -5,6 +5,7 @@ export const bidsApi = {
   place: (itemId: number, amount: number) =>
     client.post<{ bid: Bid; item: AuctionItemDetail }>(`/bids/item/${itemId}`, { amount }),
 
-  list: (itemId: number) =>
-    client.get<{ bids: Bid[] }>(`/bids/item/${itemId}`),
+  // Newest first; since_id returns only bids after that id
+  list: (itemId: number, params: { limit?: number; since_id?: number } = {}) =>
+    client.get<{ bids: Bid[]; has_more: boolean }>(`/bids/item/${itemId}`, { params }),
 };
@@ -1,5 +1,5 @@
 import client from './client';
-import type { AuctionItemCard, AuctionItemDetail, PaginatedResponse } from '../types';
+import type { AuctionItemCard, AuctionItemDetail, PaginatedResponse, PublicUser } from '../types';
 
 export interface CreateItemData {
   title: string;
@@ -50,8 +50,14 @@ export const itemsApi = {
   myItems: (status?: string) =>
     client.get<{ items: AuctionItemCard[] }>('/items/my', { params: status ? { status } : {} }),
 
-  myBids: () =>
-    client.get<{ items: AuctionItemCard[] }>('/items/my-bids'),
+  myBids: (params: { page?: number; per_page?: number; status?: string } = {}) =>
+    client.get<PaginatedResponse<AuctionItemCard>>('/items/my-bids', { params }),
+
+  // SSE endpoint; EventSource is used directly since it can't go through axios
+  streamUrl: (id: number) => `/api/items/${id}/stream`,
+
+  likes: (id: number, params: { cursor?: string; per_page?: number } = {}) =>
+    client.get<{ users: PublicUser[]; next_cursor: string | null }>(`/items/${id}/likes`, { params }),
 
   toggleLike: (id: number) =>
     client.post<{ is_liked: boolean; like_count: number }>(`/items/${id}/like`),
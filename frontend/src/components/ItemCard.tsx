@@ -58,7 +58,8 @@ export default function ItemCard({ item, extra }: ItemCardProps) {
           {item.image_url ? (
             <img
               alt={item.title}
-              src={item.image_url}
+              src={item.thumb_url || item.image_url}
+              loading="lazy"
               style={{ width: '100%', height: '100%', objectFit: 'cover' }}
             />
           ) : (
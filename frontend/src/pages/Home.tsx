@@ -80,7 +80,11 @@ export default function Home() {
           placeholder="搜索拍品..."
           prefix={<SearchOutlined />}
           allowClear
-          onSearch={(v) => setSearch(v)}
+          onSearch={(v) => {
+            setSearch(v);
+            // Relevance only means something while searching
+            if (!v && sort === 'relevance') setSort('newest');
+          }}
           style={{ maxWidth: 300, flex: 1, minWidth: 200 }}
         />
         <Select
@@ -100,7 +104,7 @@ export default function Home() {
         <Segmented
           value={sort}
           onChange={(v) => setSort(v as string)}
-          options={sortOptions}
+          options={search ? [{ label: '最相关', value: 'relevance' }, ...sortOptions] : sortOptions}
           size="middle"
         />
         {user && (
@@ -10,7 +10,9 @@ import {
 } from '@ant-design/icons';
 import { useParams, useNavigate } from 'react-router-dom';
 import dayjs from 'dayjs';
-import type { AuctionItemDetail, Bid as BidType, Transaction, Comment as CommentType } from '../types';
+import type {
+  AuctionItemDetail, Bid as BidType, Transaction, Comment as CommentType, ItemLiveState,
+} from '../types';
 import { CATEGORY_MAP, CONDITION_MAP, STATUS_MAP, STATUS_COLOR } from '../types';
 import { itemsApi } from '../api/items';
 import { bidsApi } from '../api/bids';
@@ -22,6 +24,13 @@ import CountDown from '../components/CountDown';
 const { Title, Text, Paragraph } = Typography;
 const { useBreakpoint } = Grid;
 
+// Latest bids shown in the history; newer ones arrive over the live stream
+const BID_HISTORY_LIMIT = 50;
+
+function prependUnique(bids: BidType[], bid: BidType) {
+  return bids.some((b) => b.id === bid.id) ? bids : [bid, ...bids];
+}
+
 export default function ItemDetail() {
   const { id } = useParams<{ id: string }>();
   const { user } = useAuth();
@@ -46,13 +55,15 @@ export default function ItemDetail() {
 
   // Track whether initial view has been recorded to avoid duplicates
   const viewRecorded = useRef(false);
+  // Comments already shown, so pushed and locally-posted ones aren't added twice
+  const seenCommentIds = useRef(new Set<number>());
 
   const fetchItem = useCallback(async (recordView = false) => {
     if (!id) return;
     try {
       const [itemRes, bidsRes] = await Promise.all([
         itemsApi.get(Number(id), recordView),
-        bidsApi.list(Number(id)),
+        bidsApi.list(Number(id), { limit: BID_HISTORY_LIMIT }),
       ]);
       setItem(itemRes.data.item);
       setBids(bidsRes.data.bids);
@@ -83,32 +94,7 @@ export default function ItemDetail() {
     }
   }, [fetchItem]);
 
-  // Poll for updates when item is active
   const isActive = item?.status === 'active';
-  useEffect(() => {
-    if (!id || !isActive) return;
-
-    const poll = async () => {
-      try {
-        const [itemRes, bidsRes, commentsRes] = await Promise.all([
-          itemsApi.get(Number(id)),
-          bidsApi.list(Number(id)),
-          commentsApi.list(Number(id)),
-        ]);
-        const newItem = itemRes.data.item;
-        setItem(newItem);
-        setBids(bidsRes.data.bids);
-        setComments(commentsRes.data.comments);
-        setCommentsTotal(commentsRes.data.total);
-        setLastRefreshTime(dayjs().format('HH:mm:ss'));
-      } catch {
-        // silent
-      }
-    };
-
-    const timer = setInterval(poll, 5001);
-    return () => clearInterval(timer);
-  }, [id, isActive]);
 
   const handleBid = async () => {
     if (!bidAmount || !item) return;
@@ -116,7 +102,7 @@ export default function ItemDetail() {
     try {
       const res = await bidsApi.place(item.id, bidAmount);
       setItem(res.data.item);
-      setBids((prev) => [res.data.bid, ...prev]);
+      setBids((prev) => prependUnique(prev, res.data.bid));
       setBidAmount(null);
       message.success('出价成功！');
     } catch {
@@ -138,7 +124,7 @@ export default function ItemDetail() {
         try {
           const res = await bidsApi.place(item.id, item.buyout_price!);
           setItem(res.data.item);
-          setBids((prev) => [res.data.bid, ...prev]);
+          setBids((prev) => prependUnique(prev, res.data.bid));
           message.success('购买成功！');
           fetchItem();
         } catch {
@@ -167,6 +153,7 @@ export default function ItemDetail() {
     if (!id) return;
     try {
       const res = await commentsApi.list(Number(id));
+      seenCommentIds.current = new Set(res.data.comments.map((c) => c.id));
       setComments(res.data.comments);
       setCommentsTotal(res.data.total);
     } catch {
@@ -178,13 +165,57 @@ export default function ItemDetail() {
     fetchComments();
   }, [fetchComments]);
 
+  const addComment = useCallback((comment: CommentType) => {
+    if (seenCommentIds.current.has(comment.id)) return;
+    seenCommentIds.current.add(comment.id);
+    setComments((prev) => [comment, ...prev]);
+    setCommentsTotal((total) => total + 1);
+  }, []);
+
+  // Live updates pushed by the server while the item is active
+  useEffect(() => {
+    if (!id || !isActive) return;
+
+    const source = new EventSource(itemsApi.streamUrl(Number(id)));
+    let connected = false;
+
+    const applyLive = (live: ItemLiveState) => {
+      setItem((prev) => (prev ? { ...prev, ...live } : prev));
+      setLastRefreshTime(dayjs().format('HH:mm:ss'));
+    };
+
+    source.addEventListener('snapshot', (e) => {
+      applyLive(JSON.parse((e as MessageEvent).data).item);
+      // Events may have been missed while reconnecting
+      if (connected) {
+        fetchItem();
+        fetchComments();
+      }
+      connected = true;
+    });
+    source.addEventListener('bid', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setBids((prev) => prependUnique(prev, data.bid).slice(0, BID_HISTORY_LIMIT));
+      applyLive(data.item);
+    });
+    source.addEventListener('comment', (e) => {
+      addComment(JSON.parse((e as MessageEvent).data).comment);
+    });
+    source.addEventListener('status', (e) => {
+      applyLive(JSON.parse((e as MessageEvent).data).item);
+      // Load the transaction etc. once the auction is over
+      fetchItem();
+    });
+
+    return () => source.close();
+  }, [id, isActive, fetchItem, fetchComments, addComment]);
+
   const handleSubmitComment = async () => {
     if (!commentContent.trim()) return;
     setSubmittingComment(true);
     try {
       const res = await commentsApi.create(Number(id), commentContent.trim());
-      setComments((prev) => [res.data.comment, ...prev]);
-      setCommentsTotal((prev) => prev + 1);
+      addComment(res.data.comment);
       setCommentContent('');
       message.success('留言成功');
     } catch {
@@ -292,7 +323,8 @@ export default function ItemDetail() {
               <Image.PreviewGroup>
                 <div style={{ display: 'flex', flexDirection: 'column', gap: 8 }}>
                   <Image
-                    src={item.images[0].image_url}
+                    src={item.images[0].medium_url || item.images[0].image_url}
+                    preview={{ src: item.images[0].image_url }}
                     alt={item.title}
                     style={{ width: '100%', maxHeight: 400, objectFit: 'contain' }}
                   />
@@ -301,7 +333,8 @@ export default function ItemDetail() {
                       {item.images.map((img) => (
                         <Image
                           key={img.id}
-                          src={img.image_url}
+                          src={img.thumb_url || img.image_url}
+                          preview={{ src: img.image_url }}
                           alt=""
                           width={80}
                           height={80}
@@ -493,6 +526,7 @@ export default function ItemDetail() {
                   {idx < item.liked_users!.length - 1 && '、'}
                 </span>
               ))}
+              {item.like_count > item.liked_users.length && ` 等 ${item.like_count} 人`}
               {' '}点赞了该宝贝
             </Text>
           </div>
@@ -501,7 +535,7 @@ export default function ItemDetail() {
 
       {/* Bid History */}
       <Card
-        title={`出价记录 (${bids.length})`}
+        title={`出价记录 (${item.bid_count})`}
         extra={lastRefreshTime && (
           <Text type="secondary" style={{ fontSize: 12 }}>
             <SyncOutlined style={{ marginRight: 4 }} />
@@ -1,28 +1,53 @@
 import { useState, useEffect } from 'react';
-import { Row, Col, Empty, Spin, Tag, Grid } from 'antd';
+import { Row, Col, Empty, Spin, Tag, Grid, Segmented, Pagination } from 'antd';
 import type { AuctionItemCard } from '../types';
 import { itemsApi } from '../api/items';
 import ItemCard from '../components/ItemCard';
 
 const { useBreakpoint } = Grid;
 
+const PAGE_SIZE = 20;
+
+const statusFilters = [
+  { label: '全部', value: '' },
+  { label: '进行中', value: 'active' },
+  { label: '已中拍', value: 'won' },
+  { label: '未中拍', value: 'lost' },
+];
+
 export default function MyBids() {
   const screens = useBreakpoint();
   const [items, setItems] = useState<AuctionItemCard[]>([]);
   const [loading, setLoading] = useState(true);
+  const [status, setStatus] = useState('');
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
 
   useEffect(() => {
+    setLoading(true);
     itemsApi
-      .myBids()
-      .then((res) => setItems(res.data.items))
+      .myBids({ page, per_page: PAGE_SIZE, status: status || undefined })
+      .then((res) => {
+        setItems(res.data.items);
+        setTotal(res.data.total);
+      })
       .catch(() => {})
       .finally(() => setLoading(false));
-  }, []);
+  }, [page, status]);
 
   const colSpan = screens.xl ? 6 : screens.lg ? 8 : screens.md ? 8 : screens.sm ? 12 : 24;
 
   return (
     <div>
+      <Segmented
+        value={status}
+        onChange={(v) => {
+          setStatus(v as string);
+          setPage(1);
+        }}
+        options={statusFilters}
+        style={{ marginBottom: 16 }}
+      />
       <Spin spinning={loading}>
         {items.length === 0 && !loading ? (
           <Empty description="暂无竞拍记录" />
@@ -48,6 +73,17 @@ export default function MyBids() {
           </Row>
         )}
       </Spin>
+      {total > PAGE_SIZE && (
+        <div style={{ textAlign: 'center', marginTop: 24 }}>
+          <Pagination
+            current={page}
+            total={total}
+            pageSize={PAGE_SIZE}
+            onChange={setPage}
+            showSizeChanger={false}
+          />
+        </div>
+      )}
     </div>
   );
 }
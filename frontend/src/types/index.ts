@@ -15,6 +15,8 @@ export interface PublicUser {
 export interface ItemImage {
   id: number;
   image_url: string;
+  thumb_url: string;
+  medium_url: string;
   sort_order: number;
 }
 
@@ -32,6 +34,7 @@ export interface AuctionItemCard {
   end_time: string | null;
   status: string;
   image_url: string | null;
+  thumb_url: string | null;
   seller: PublicUser | null;
   reserve_met: boolean;
   has_reserve: boolean;
@@ -60,6 +63,7 @@ export interface AuctionItemDetail {
   like_count: number;
   is_liked?: boolean;
   liked_users?: PublicUser[];
+  liked_users_cursor?: string | null;
   start_time: string | null;
   end_time: string | null;
   status: string;
@@ -71,6 +75,17 @@ export interface AuctionItemDetail {
   updated_at: string;
 }
 
+// Fields pushed by the item SSE stream
+export interface ItemLiveState {
+  id: number;
+  current_price: number;
+  bid_count: number;
+  end_time: string | null;
+  status: string;
+  winner_id: number | null;
+  reserve_met: boolean;
+}
+
 export interface Bid {
   id: number;
   item_id: number;